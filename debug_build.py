@@ -4,6 +4,7 @@ Debug script - check what files were actually generated
 """
 
 import os
+import json
 from pathlib import Path
 
 def check_output():
@@ -53,15 +54,24 @@ def check_output():
     else:
         print("  ❌ steward/ directory doesn't exist")
     
-    # Check static files
+    # Check static files (CSS/JS are published under fingerprinted names,
+    # listed in asset-manifest.json)
     print("\nStatic Files:")
-    for static_file in ['static/css/main.css', 'static/js/main.js', 'static/search-index.json']:
-        path = output_dir / static_file
+    manifest_path = output_dir / 'asset-manifest.json'
+    if manifest_path.exists():
+        with open(manifest_path, encoding='utf-8') as f:
+            assets = json.load(f)
+    else:
+        assets = {}
+        print("  ❌ asset-manifest.json - MISSING")
+    for static_file in ['static/css/main.css', 'static/js/main.js', 'static/search/meta.json']:
+        published = assets.get(static_file, static_file)
+        path = output_dir / published
         if path.exists():
             size = path.stat().st_size
-            print(f"  ✅ {static_file} ({size:,} bytes)")
+            print(f"  ✅ {published} ({size:,} bytes)")
         else:
-            print(f"  ❌ {static_file} - MISSING")
+            print(f"  ❌ {published} - MISSING")
     
     # Full file count
     print(f"\nTotal HTML files: {len(list(output_dir.rglob('*.html')))}")
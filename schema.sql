@@ -49,6 +49,7 @@ CREATE TABLE IF NOT EXISTS records (
     date_added TEXT DEFAULT CURRENT_TIMESTAMP,
     last_updated TEXT DEFAULT CURRENT_TIMESTAMP,
     view_count INTEGER DEFAULT 0,
+    content_hash TEXT,  -- Hash of the imported JSON item (delta imports skip unchanged items)
     
     UNIQUE(id)
 );
@@ -89,14 +90,24 @@ CREATE INDEX IF NOT EXISTS idx_records_item_type ON records(item_type);
 CREATE INDEX IF NOT EXISTS idx_records_game ON records(game);
 CREATE INDEX IF NOT EXISTS idx_records_organization ON records(organization);
 CREATE INDEX IF NOT EXISTS idx_records_brand ON records(brand);
-CREATE INDEX IF NOT EXISTS idx_records_steward ON records(steward);
 CREATE INDEX IF NOT EXISTS idx_records_year ON records(year);
 CREATE INDEX IF NOT EXISTS idx_records_rarity ON records(rarity);
-CREATE INDEX IF NOT EXISTS idx_records_featured ON records(featured);
+CREATE INDEX IF NOT EXISTS idx_records_featured_order ON records(featured, featured_order, date_added DESC);
 CREATE INDEX IF NOT EXISTS idx_records_verified ON records(verified);
 CREATE INDEX IF NOT EXISTS idx_records_date_added ON records(date_added);
-CREATE INDEX IF NOT EXISTS idx_media_record_id ON media(record_id);
-CREATE INDEX IF NOT EXISTS idx_media_is_primary ON media(is_primary);
+-- A record's media in gallery order, and its primary image (lowest id first,
+-- url included so the lookup never touches the table)
+CREATE INDEX IF NOT EXISTS idx_media_record_order ON media(record_id, display_order);
+CREATE INDEX IF NOT EXISTS idx_media_primary ON media(record_id, is_primary, id, url);
+
+-- Superseded by the composite indexes above (older databases)
+DROP INDEX IF EXISTS idx_records_steward;
+DROP INDEX IF EXISTS idx_records_featured;
+DROP INDEX IF EXISTS idx_media_record_id;
+DROP INDEX IF EXISTS idx_media_is_primary;
+-- No longer used: browse and steward pages are ordered in memory
+DROP INDEX IF EXISTS idx_records_steward_date;
+DROP INDEX IF EXISTS idx_records_browse;
 
 -- Full-text search index
 CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
@@ -120,20 +131,16 @@ CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
     VALUES (new.rowid, new.id, new.name, new.description, new.steward, new.organization, new.brand, new.game, new.badges, new.tags, new.notes);
 END;
 
+-- records_fts is an external-content table: removing a row's old tokens
+-- needs the old values passed through the 'delete' command
 CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
-    DELETE FROM records_fts WHERE rowid = old.rowid;
+    INSERT INTO records_fts(records_fts, rowid, id, name, description, steward, organization, brand, game, badges, tags, notes)
+    VALUES ('delete', old.rowid, old.id, old.name, old.description, old.steward, old.organization, old.brand, old.game, old.badges, old.tags, old.notes);
 END;
 
 CREATE TRIGGER IF NOT EXISTS records_au AFTER UPDATE ON records BEGIN
-    UPDATE records_fts SET 
-        name = new.name,
-        description = new.description,
-        steward = new.steward,
-        organization = new.organization,
-        brand = new.brand,
-        game = new.game,
-        badges = new.badges,
-        tags = new.tags,
-        notes = new.notes
-    WHERE rowid = new.rowid;
+    INSERT INTO records_fts(records_fts, rowid, id, name, description, steward, organization, brand, game, badges, tags, notes)
+    VALUES ('delete', old.rowid, old.id, old.name, old.description, old.steward, old.organization, old.brand, old.game, old.badges, old.tags, old.notes);
+    INSERT INTO records_fts(rowid, id, name, description, steward, organization, brand, game, badges, tags, notes)
+    VALUES (new.rowid, new.id, new.name, new.description, new.steward, new.organization, new.brand, new.game, new.badges, new.tags, new.notes);
 END;
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for Esports Museum
+Generates seeded synthetic catalogues, imports them with migrate.py and
+builds them with build.py, then compares throughput, peak memory and output
+size against a stored baseline
+"""
+
+import json
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from pathlib import Path
+
+from build import MuseumSiteGenerator, peak_rss_mb
+from migrate import migrate_data
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_FILE = ROOT / 'benchmarks' / 'baseline.json'
+
+# Named catalogue sizes (--sizes accepts these or plain numbers)
+SIZES = {'small': 1000, 'medium': 10000, 'large': 100000}
+
+# Metric -> True if higher is better; anything else is compared as lower-is-better
+METRICS = {
+    'migrate_records_per_sec': True,
+    'build_pages_per_sec': True,
+    'peak_rss_mb': False,
+    'output_mb': False,
+}
+
+# Vocabulary for synthetic records (shaped like example-data.json)
+GAMES = [('Call of Duty', 30), ('Halo', 20), ('Counter-Strike', 15), ('Valorant', 10),
+         ('League of Legends', 10), ('Rocket League', 5), ('Dota 2', 5), ('Overwatch', 5)]
+ITEM_TYPES = [('jersey', 40), ('signature', 20), ('peripheral', 15), ('hardware', 10),
+              ('media', 10), ('other', 5)]
+ORGANIZATIONS = ['OpTic Gaming', 'FaZe Clan', 'Team Liquid', 'Cloud9', 'Evil Geniuses',
+                 '100 Thieves', 'compLexity', 'Major League Gaming', 'Fnatic', 'Sentinels']
+BRANDS = ['PlayerWear', 'Nike', 'Scuf', 'Astro', 'Turtle Beach', 'Razer', 'Crown Awards',
+          'Logitech', 'HyperX']
+BADGES = ['World Champion', 'Game-Worn', 'Signed', 'Championship', 'Historical', 'MLG',
+          'Tournament-Used', 'Limited Edition', 'Prototype']
+RARITIES = [('common', 25), ('uncommon', 25), ('rare', 25), ('very_rare', 12),
+            ('ultra_rare', 8), ('unique', 5)]
+AVAILABILITY = ['in_collection', 'for_sale', 'traded', 'private']
+CONDITIONS = ['mint', 'near_mint', 'excellent', 'good', 'fair', 'poor']
+METHODS = ['tournament', 'auction', 'purchase', 'trade', 'gift']
+PLAYERS = ['Scump', 'FormaL', 'Crimsix', 'Karma', 'Ogre2', 'Snip3down', 'Shroud', 'TenZ',
+           'Faker', 'Simp', 'aBeZy', 'Clayster', 'Nadeshot', 'Hiko', 'Aches', 'Dashy']
+WORDS = ('championship grand finals worn signed original jersey controller headset trophy '
+         'season event lan stage iconic rare team player match legendary series edition '
+         'authentic certificate collection memorabilia').split()
+
+def weighted(rng, choices):
+    """Pick from [(value, weight), ...]"""
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+def synthetic_item(rng, n, stewards):
+    """One catalogue item with realistic media/badge/custody distributions"""
+    item_id = f"BM-{n:06d}"
+    game = weighted(rng, GAMES)
+    item_type = weighted(rng, ITEM_TYPES)
+    organization = rng.choice(ORGANIZATIONS)
+    player = rng.choice(PLAYERS)
+    # Most items are recent; a long tail goes back to the early MLG days
+    year = max(2003, 2025 - int(rng.expovariate(1 / 5)))
+    steward = f"steward_{int(rng.paretovariate(1.2)) % stewards:05d}"
+
+    media = []
+    for i in range(rng.choices(range(7), [5, 35, 25, 15, 10, 6, 4])[0]):
+        media.append({
+            'type': 'image',
+            'url': f"https://example.com/museum/{item_id}-{i}.jpg",
+            'caption': sentence(rng, 4) if rng.random() < 0.3 else None,
+        })
+    if rng.random() < 0.1:
+        media.append({'type': 'youtube', 'url': f"https://youtu.be/{item_id}"})
+
+    custody, holder = [], player
+    for event in range(rng.choices(range(6), [20, 30, 25, 15, 7, 3])[0]):
+        receiver = steward if event == 0 else f"collector_{rng.randrange(10000)}"
+        custody.append({
+            'date': f"{min(2025, year + event)}-{rng.randint(1, 12):02d}",
+            'from': holder,
+            'to': receiver,
+            'method': rng.choice(METHODS),
+            'notes': sentence(rng, 8) if rng.random() < 0.5 else None,
+        })
+        holder = receiver
+
+    return {
+        'id': item_id,
+        'name': f"{organization} {item_type.title()} - {player} {year} #{n}",
+        'organization': organization,
+        'brand': rng.choice(BRANDS) if rng.random() < 0.8 else None,
+        'game': game,
+        'item_type': item_type,
+        'badges': rng.sample(BADGES, rng.choices(range(5), [30, 30, 20, 15, 5])[0]),
+        'tags': sorted({player.lower(), game.split()[0].lower(), str(year)}
+                       | {rng.choice(WORDS) for _ in range(rng.randint(0, 4))}),
+        'year': year,
+        'steward': steward,
+        'steward_link': f"https://twitter.com/{steward}" if rng.random() < 0.5 else None,
+        'rarity': weighted(rng, RARITIES),
+        'availability': rng.choice(AVAILABILITY),
+        'condition': rng.choice(CONDITIONS),
+        'chain_of_custody': custody,
+        'description': ' '.join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(1, 5))),
+        'notes': sentence(rng, 10) if rng.random() < 0.4 else None,
+        'verified': rng.random() < 0.6,
+        'verification_date': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        'featured': n % 500 == 0,
+        'featured_order': n // 500 if n % 500 == 0 else None,
+        'date_added': f"{rng.randint(2022, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        'media': media,
+    }
+
+def write_catalogue(path, records, seed):
+    """Write a seeded synthetic catalogue as JSON Lines (same seed, same file)"""
+    rng = random.Random(f"{seed}:{records}")
+    stewards = max(1, records // 20)
+    with open(path, 'w', encoding='utf-8') as f:
+        for n in range(records):
+            f.write(json.dumps(synthetic_item(rng, n, stewards)) + '\n')
+
+def directory_size(path):
+    """(total bytes, file count) under path"""
+    total = files = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.path.getsize(os.path.join(dirpath, name))
+            files += 1
+    return total, files
+
+def run_one(records, seed, jobs):
+    """Generate, import and build one catalogue; runs in its own process so
+    peak RSS belongs to this size alone"""
+    os.chdir(ROOT)  # schema.sql, templates/ and static/ are relative paths
+    with tempfile.TemporaryDirectory(prefix='museum-bench-') as tmp:
+        tmp = Path(tmp)
+        catalogue, db_file, output_dir = tmp / 'catalogue.jsonl', tmp / 'museum.db', tmp / 'output'
+        write_catalogue(catalogue, records, seed)
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            if not migrate_data(str(catalogue), str(db_file), stream=True):
+                raise SystemExit(f"migrate_data failed for {records} records")
+            migrate_seconds = time.perf_counter() - start
+
+            generator = MuseumSiteGenerator(str(db_file), str(output_dir), jobs=jobs, profile=True)
+            start = time.perf_counter()
+            if not generator.build():
+                raise SystemExit(f"build failed for {records} records")
+            build_seconds = time.perf_counter() - start
+
+        output_bytes, output_files = directory_size(output_dir)
+        profile = generator.profile_report()
+        rss = [mb for mb in (peak_rss_mb('self'), peak_rss_mb('children')) if mb is not None]
+        return {
+            'records': records,
+            'migrate_seconds': round(migrate_seconds, 3),
+            'migrate_records_per_sec': round(records / migrate_seconds, 1),
+            'build_seconds': round(build_seconds, 3),
+            'build_pages_per_sec': round(profile['pages']['rendered'] / build_seconds, 1),
+            'build_records_per_sec': round(records / build_seconds, 1),
+            'pages': profile['pages']['rendered'],
+            'peak_rss_mb': max(rss) if rss else None,
+            'output_mb': round(output_bytes / 1e6, 2),
+            'output_files': output_files,
+            'db_mb': round(db_file.stat().st_size / 1e6, 2),
+            'stages': {name: stage['wall'] for name, stage in profile['stages'].items()},
+        }
+
+def compare(results, baseline, tolerance):
+    """Print each metric against the baseline; returns the regressions found"""
+    regressions = []
+    for size, result in results.items():
+        base = baseline.get(size)
+        if not base:
+            print(f"⚠ No baseline for {size} records")
+            continue
+        for metric, higher_is_better in METRICS.items():
+            now, then = result.get(metric), base.get(metric)
+            if not now or not then:
+                continue
+            change = now / then - 1
+            regressed = -change > tolerance if higher_is_better else change > tolerance
+            mark = '❌' if regressed else '✓'
+            print(f"{mark} {size:>7} {metric:<24} {then:>12} -> {now:<12} ({change:+.1%})")
+            if regressed:
+                regressions.append((size, metric))
+    return regressions
+
+def parse_sizes(value):
+    return [SIZES[size] if size in SIZES else int(size) for size in value.split(',')]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark migrate + build on synthetic catalogues')
+    parser.add_argument('--sizes', default='small,medium',
+                        help='Comma-separated catalogue sizes: small (1k), medium (10k), '
+                             'large (100k) or record counts')
+    parser.add_argument('--seed', type=int, default=1, help='Catalogue generator seed')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Build worker processes')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help='Baseline results file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store these results as the new baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative regression per metric (default 0.25)')
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    parser.add_argument('--run-one', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, args.seed, args.jobs)))
+        exit(0)
+
+    print("\n" + "="*60)
+    print("ESPORTS MUSEUM - BENCHMARK")
+    print("="*60 + "\n")
+
+    results = {}
+    for records in parse_sizes(args.sizes):
+        print(f"Benchmarking {records} records...")
+        proc = subprocess.run(
+            [sys.executable, __file__, '--run-one', str(records),
+             '--seed', str(args.seed), '--jobs', str(args.jobs)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(proc.stdout + proc.stderr)
+            print(f"❌ Benchmark failed for {records} records")
+            exit(1)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results[str(records)] = result
+        print(f"✓ migrate {result['migrate_records_per_sec']} records/s, "
+              f"build {result['build_pages_per_sec']} pages/s "
+              f"({result['pages']} pages in {result['build_seconds']}s), "
+              f"peak RSS {result['peak_rss_mb']} MB, output {result['output_mb']} MB")
+
+    data = {'seed': args.seed, 'jobs': args.jobs, 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        if baseline_path.exists():
+            # Keep baselines for sizes not run this time
+            saved = json.loads(baseline_path.read_text(encoding='utf-8'))
+            data['results'] = {**saved.get('results', {}), **results}
+        baseline_path.write_text(json.dumps(data, indent=2) + '\n', encoding='utf-8')
+        print(f"\n✓ Baseline saved to: {baseline_path}")
+        exit(0)
+
+    if not baseline_path.exists():
+        print(f"\n⚠ No baseline at {baseline_path} (create one with --save-baseline)")
+        exit(0)
+
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+    if (baseline.get('seed'), baseline.get('jobs')) != (args.seed, args.jobs):
+        print("⚠ Baseline was recorded with a different --seed/--jobs")
+    print(f"\nCompared to {baseline_path} (tolerance {args.tolerance:.0%}):")
+    regressions = compare(results, baseline.get('results', {}), args.tolerance)
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} performance regressions")
+        exit(1)
+    print("\n✅ No regressions")
+    exit(0)
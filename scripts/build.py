@@ -7,25 +7,615 @@ Generates static HTML from SQLite database using Jinja2
 import sqlite3
 import json
 import os
-import shutil
+import hashlib
+import re
+import unicodedata
+import bisect
+import heapq
+import collections
+import argparse
+import time
+import sys
+import contextlib
+import cProfile
+import gzip
+import io
+import base64
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, meta
+from markupsafe import Markup
+from minify import minify_css, minify_js, minify_html, parse_css, critical_css
 import datetime
 
+try:
+    import resource  # Peak RSS for the profile report (not available on Windows)
+except ImportError:
+    resource = None
+
+try:
+    import brotli  # Optional: .br siblings next to the .gz ones (--compress)
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, ImageOps  # Optional: responsive image derivatives
+except ImportError:
+    Image = None
+
+# Written into the output directory; maps each generated page to the hash of
+# the inputs it was rendered from (template chain + render context)
+MANIFEST_NAME = '.build-manifest.json'
+
+# Compiled templates are kept between builds (Jinja compares each template's
+# source checksum, so edited templates are recompiled)
+TEMPLATE_CACHE_DIR = Path('.cache') / 'jinja'
+
+# Stands in for base_path while a cached template fragment is rendered (see
+# fragment()); must survive HTML escaping unchanged
+FRAGMENT_BASE_PATH = '\x00base_path\x00'
+# Rendered fragments kept (least recently used dropped first): a record's
+# card comes back on its browse, steward and neighbours' pages
+FRAGMENT_CACHE_SIZE = 4096
+
+# Stylesheets and scripts are published under content-hashed names
+# (main.css -> main.<hash>.css) so they can be cached forever; templates
+# resolve them with asset() and this manifest maps logical -> published paths
+# for other tools. Other static files (media images, whose stored media.url
+# points at them) keep their path
+ASSET_MANIFEST_NAME = 'asset-manifest.json'
+ASSET_HASH_LENGTH = 10
+FINGERPRINT_EXTENSIONS = {'.css', '.js'}
+
+# --minify: pages built from these templates get the CSS their above-the-fold
+# part (everything before FOLD_MARKER) needs inlined, and load main.css async
+CRITICAL_CSS_TEMPLATES = {'index.html', 'browse.html'}
+FOLD_MARKER = '<!-- /above-the-fold -->'
+STATIC_MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+def fingerprint(path, data):
+    """static/css/main.css -> static/css/main.<hash>.css"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:ASSET_HASH_LENGTH]}{ext}"
+
+# The builder only reads the database: connections are read-only and
+# immutable (no locking or change checks), with the file memory-mapped and a
+# larger page cache
+SQLITE_PRAGMAS = {
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB
+    'temp_store': 'MEMORY',
+}
+
+# Listing rows (cards, browse grids, related records, search docs) are
+# tuple-backed and carry only what those need; a record's full row, media and
+# decoded JSON fields exist only while its own page renders (iter_records)
+SUMMARY_FIELDS = ('id', 'name', 'game', 'item_type', 'steward', 'year', 'verified',
+                  'organization', 'brand', 'rarity', 'condition', 'tags', 'display_priority',
+                  'content_hash', 'primary_image')
+SUMMARY_SELECT = """
+    SELECT r.id, r.name, r.game, r.item_type, r.steward, r.year, r.verified,
+           r.organization, r.brand, r.rarity, r.condition, r.tags, r.display_priority,
+           r.content_hash,
+           (SELECT url FROM media WHERE record_id = r.id AND is_primary = 1
+            ORDER BY id LIMIT 1) AS primary_image
+    FROM records r
+"""
+RecordSummary = collections.namedtuple('RecordSummary', SUMMARY_FIELDS + ('primary_image_variants',))
+
+# Related records: points per shared attribute, seed for stable tie-breaking,
+# and how many neighbours to consider from each (possibly huge) posting list
+RELATED_WEIGHTS = {'organization': 3, 'brand': 2, 'game': 1, 'tag': 1}
+RELATED_SEED = 'esports-museum'
+RELATED_WINDOW = 64
+
+# Browse facets: labels for known values (anything else is shown as stored)
+ITEM_TYPE_LABELS = {
+    'jersey': 'Jerseys',
+    'hardware': 'Hardware',
+    'peripheral': 'Peripherals',
+    'signature': 'Signatures',
+    'media': 'Media',
+    'other': 'Other',
+}
+GAME_LABELS = {
+    'Call of Duty': 'CoD',
+    'Counter-Strike': 'CS',
+    'League of Legends': 'LoL',
+    'Rocket League': 'RL',
+}
+ERAS = [
+    ('golden', 'Golden Age (≤2015)'),
+    ('global', 'Global Era (2016-2020)'),
+    ('modern', 'Modern (2021+)'),
+]
+RARITY_LABELS = {
+    'common': 'Common',
+    'uncommon': 'Uncommon',
+    'rare': 'Rare',
+    'very_rare': 'Very Rare',
+    'ultra_rare': 'Ultra Rare',
+    'unique': 'Unique',
+}
+CONDITION_LABELS = {
+    'mint': 'Mint',
+    'near_mint': 'Near Mint',
+    'excellent': 'Excellent',
+    'good': 'Good',
+    'fair': 'Fair',
+    'poor': 'Poor',
+}
+
+# Filter groups on the browse page: (key used in URLs and static/js/browse.js,
+# heading, label of the "any" chip). Only type/game/era have prerendered
+# pages (browse/<key>-<slug>/, one facet at a time); any combination of
+# any groups is filtered in the browser from the files browse_index_files()
+# writes, whose cards/ chunks hold this many records each
+BROWSE_GROUPS = (
+    ('type', 'Type', 'All'),
+    ('game', 'Game', 'All'),
+    ('era', 'Era', 'All Eras'),
+    ('rarity', 'Rarity', 'Any'),
+    ('condition', 'Condition', 'Any'),
+    ('org', 'Organization', 'Any'),
+    ('verified', 'Authentication', 'Any'),
+)
+BROWSE_PAGE_GROUPS = ('type', 'game', 'era')
+BROWSE_CARD_CHUNK = 256
+
+def era_of(year):
+    """Era slug for a year (None when the year is unknown)"""
+    if not year:
+        return None
+    if year <= 2015:
+        return 'golden'
+    if year <= 2020:
+        return 'global'
+    return 'modern'
+
+def browse_values(record):
+    """A record's value in each BROWSE_GROUPS group (None: no value)"""
+    return {
+        'type': record.item_type,
+        'game': record.game,
+        'era': era_of(record.year),
+        'rarity': record.rarity,
+        'condition': record.condition,
+        'org': record.organization,
+        'verified': 'verified' if record.verified else None,
+    }
+
+def bitset(positions, size):
+    """Browse positions (indexes into browse_order, i.e. facets.json "ids")
+    -> base64 bitset over 0..size-1. Position n is bit n % 8 (least
+    significant first) of byte n // 8, and the bytes are padded to a whole
+    number of 32-bit words, so they also read as little-endian uint32 words
+    with position n at bit n % 32 of word n // 32 - how decodeBits() in
+    static/js/browse.js unpacks them"""
+    bits = bytearray(-(-size // 32) * 4)
+    for n in positions:
+        bits[n >> 3] |= 1 << (n & 7)
+    return base64.b64encode(bits).decode('ascii')
+
+def slugify(value):
+    """URL slug used in browse paths (e.g. 'Call of Duty' -> 'call-of-duty')"""
+    return str(value).lower().replace(' ', '-')
+
+def base_path_for(path):
+    """Relative prefix back to the site root from an output path"""
+    return '../' * path.count('/')
+
+def page_dir(browse_dir, page):
+    """Directory of a paginated listing: page 1 at the top, then page/N/"""
+    return browse_dir if page == 1 else f"{browse_dir}page/{page}/"
+
+# Search index: fields tokenized when records_fts is unavailable, shard key
+# length (matches static/js/search-worker.js), shortest token indexed, and
+# records per docs/ file
+SEARCH_FIELDS = ('name', 'description', 'steward', 'organization', 'brand', 'game')
+SEARCH_PREFIX_LENGTH = 2
+SEARCH_MIN_TOKEN = 2
+SEARCH_DOC_CHUNK = 50
+
+# Service worker (templates/sw.js), written to the site root so it controls
+# every page. It precaches the fingerprinted stylesheets and scripts, and the
+# search shards while they total at most SW_PRECACHE_SEARCH_BYTES (larger
+# indexes are cached shard by shard as queries need them). Everything else
+# (images...) goes to its size-limited runtime cache; under these prefixes
+# URLs are content-addressed, so a cached copy is never revalidated
+SERVICE_WORKER_NAME = 'sw.js'
+SW_PRECACHE_EXTENSIONS = {'.css', '.js'}
+SW_PRECACHE_SEARCH_BYTES = 2 * 1024 * 1024
+SW_IMMUTABLE_PREFIXES = ('static/img/', 'static/search/', 'static/browse/')
+
+# bm25() column weights, in records_fts column order (schema.sql)
+FTS_WEIGHTS = {
+    'id': 0,            # UNINDEXED
+    'name': 10,
+    'description': 1,
+    'steward': 4,
+    'organization': 4,
+    'brand': 3,
+    'game': 3,
+    'badges': 2,
+    'tags': 2,
+    'notes': 0.5,
+}
+
+def search_tokens(text):
+    """Normalized search tokens: lowercase, accents stripped, split on
+    anything that is not a letter or digit (mirrors searchTokens in
+    static/js/search-worker.js)"""
+    text = unicodedata.normalize('NFKD', str(text)).lower()
+    text = ''.join(c for c in text if not unicodedata.category(c).startswith('M'))
+    return re.findall(r'[^\W_]+', text)
+
+SHARD_SAFE_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789')
+
+def shard_name(prefix):
+    """File-safe shard name: a-z/0-9 kept, anything else as _<hex code point>"""
+    return ''.join(c if c in SHARD_SAFE_CHARS else f"_{ord(c):x}" for c in prefix)
+
+def delta_encode(numbers):
+    """Sorted integers as first value + gaps (small numbers = short JSON)"""
+    return [n - prev for prev, n in zip([0] + numbers, numbers)]
+
+def round_score(score):
+    """Relevance to 3 significant digits (plenty for ranking, fewer bytes)"""
+    return float(f"{score:.3g}")
+
+def compact_json(data):
+    """Minified JSON for files fetched by the browser"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+def stable_hash(*parts):
+    """Deterministic 64-bit hash (unlike hash(), not salted per process)"""
+    digest = hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+# Precompressed .gz/.br siblings (--compress) for servers that can send them
+# as-is (nginx gzip_static/brotli_static, most CDNs) instead of compressing
+# on every request
+COMPRESS_EXTENSIONS = {'.html', '.css', '.js', '.json', '.svg', '.xml', '.txt'}
+COMPRESS_MIN_SIZE = 256  # Smaller files barely shrink
+
+# Responsive derivatives of locally stored media images (needs Pillow),
+# cached by source hash so unchanged images are never re-encoded
+IMAGE_CACHE_DIR = Path('.cache') / 'images'
+IMAGE_WIDTHS = (320, 640, 1024)
+IMAGE_FORMATS = ('avif', 'webp')  # Offered via <source>, when Pillow can encode them
+IMAGE_QUALITY = {'avif': 50, 'webp': 75, 'jpeg': 80}
+
+# Video facades: YouTube posters are fetched once per video at build time
+# (cached under IMAGE_CACHE_DIR/youtube/<id>/) and get the same derivatives
+# as local images; where that fails pages hotlink them from i.ytimg.com
+YOUTUBE_POSTER_URL = 'https://i.ytimg.com/vi/{}/hqdefault.jpg'
+YOUTUBE_ID = re.compile(r'[\w-]{11}')
+POSTER_FETCH_TIMEOUT = 5  # Seconds
+POSTER_FETCH_THREADS = 8
+POSTER_MISSING_STATUSES = {404, 410}  # Cached as "no poster"; other errors retry next build
+
+def youtube_id(url):
+    """Video id of a youtube media URL (a bare id, youtu.be/<id>,
+    youtube.com/watch?v=<id>, /embed/<id> or /shorts/<id>); None otherwise"""
+    url = (url or '').strip()
+    if YOUTUBE_ID.fullmatch(url):
+        return url
+    parts = urllib.parse.urlsplit(url if '//' in url else '//' + url)
+    host = parts.netloc.lower().removeprefix('www.').removeprefix('m.')
+    if host == 'youtu.be':
+        candidate = parts.path.strip('/').split('/')[0]
+    elif host in ('youtube.com', 'youtube-nocookie.com'):
+        query = urllib.parse.parse_qs(parts.query)
+        candidate = query['v'][0] if 'v' in query else parts.path.rstrip('/').rsplit('/', 1)[-1]
+    else:
+        return None
+    return candidate if YOUTUBE_ID.fullmatch(candidate) else None
+
+def fetch_poster(video_id, path):
+    """Download a YouTube poster to path: True when saved, False when YouTube
+    has none (404/410: bad id), None when it could not be fetched this time
+    (network errors, rate limits, server errors)"""
+    request = urllib.request.Request(YOUTUBE_POSTER_URL.format(video_id),
+                                     headers={'User-Agent': 'esports-museum-build'})
+    try:
+        with urllib.request.urlopen(request, timeout=POSTER_FETCH_TIMEOUT) as response:
+            data = response.read()
+    except urllib.error.HTTPError as e:
+        return False if e.code in POSTER_MISSING_STATUSES else None
+    except (urllib.error.URLError, OSError):
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
+
+def is_local_image(url):
+    """Media URLs without a scheme are files in the repository (e.g. static/images/...)"""
+    return bool(url) and '://' not in url and not url.startswith(('//', 'data:'))
+
+def encode_image(image, fmt):
+    """Encode a Pillow image; returns bytes"""
+    buffer = io.BytesIO()
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    options = {'optimize': True} if fmt in ('jpeg', 'png') else {}
+    if fmt in IMAGE_QUALITY:
+        options['quality'] = IMAGE_QUALITY[fmt]
+    image.save(buffer, fmt.upper(), **options)
+    return buffer.getvalue()
+
+def gzip_compress(data):
+    """Maximum gzip compression without a timestamp (same input, same .gz)"""
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, -(-len(values) * q // 100) - 1))]
+
+def peak_rss_mb(who):
+    """Peak resident set size in MB of this process ('self') or of its
+    finished worker processes ('children'); None where unsupported"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+class BuildProfiler:
+    """Collects per-stage timings, SQL statistics, template render times and
+    bytes written for one build (see --profile-report)"""
+    
+    def __init__(self):
+        self.started = (time.perf_counter(), time.process_time())
+        self.stages = {}          # Stage name -> [wall seconds, cpu seconds]
+        self.sql_statements = 0
+        self.sql_seconds = 0.0    # Executing statements and fetching their rows
+        self.renders = {}         # Template name -> [render seconds per page]
+        self.hash_seconds = 0.0   # JSON-encoding and hashing page contexts
+        self.write_seconds = 0.0
+        self.bytes_written = 0
+        self.files_written = 0
+        self.fragments_rendered = 0
+        self.fragments_reused = 0
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a build stage (wall and CPU of this process)"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault(name, [0.0, 0.0])
+            totals[0] += time.perf_counter() - wall
+            totals[1] += time.process_time() - cpu
+    
+    def record_sql(self, seconds, statements=0):
+        self.sql_statements += statements
+        self.sql_seconds += seconds
+    
+    def record_render(self, template_name, seconds):
+        self.renders.setdefault(template_name, []).append(seconds)
+    
+    def record_fragment(self, reused):
+        if reused:
+            self.fragments_reused += 1
+        else:
+            self.fragments_rendered += 1
+    
+    def record_write(self, size, seconds):
+        self.files_written += 1
+        self.bytes_written += size
+        self.write_seconds += seconds
+    
+    def drain(self):
+        """Counters collected so far (in a worker), reset for the next chunk"""
+        data = {
+            'sql': [self.sql_statements, self.sql_seconds],
+            'renders': self.renders,
+            'hash_seconds': self.hash_seconds,
+            'write': [self.files_written, self.bytes_written, self.write_seconds],
+            'fragments': [self.fragments_rendered, self.fragments_reused],
+        }
+        self.__init__()
+        return data
+    
+    def merge(self, data):
+        """Add counters drained from a worker process"""
+        self.record_sql(data['sql'][1], data['sql'][0])
+        for template_name, seconds in data['renders'].items():
+            self.renders.setdefault(template_name, []).extend(seconds)
+        self.hash_seconds += data['hash_seconds']
+        files, size, seconds = data['write']
+        self.files_written += files
+        self.bytes_written += size
+        self.write_seconds += seconds
+        self.fragments_rendered += data['fragments'][0]
+        self.fragments_reused += data['fragments'][1]
+    
+    def report(self, pages_rendered=0, pages_skipped=0):
+        """Machine-readable build profile"""
+        wall = time.perf_counter() - self.started[0]
+        cpu = time.process_time() - self.started[1]
+        children_cpu = None
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            children_cpu = round(usage.ru_utime + usage.ru_stime, 4)
+        
+        templates = {}
+        for template_name, seconds in sorted(self.renders.items()):
+            seconds = sorted(seconds)
+            templates[template_name] = {
+                'count': len(seconds),
+                'total': round(sum(seconds), 4),
+                'p50_ms': round(percentile(seconds, 50) * 1000, 3),
+                'p90_ms': round(percentile(seconds, 90) * 1000, 3),
+                'p99_ms': round(percentile(seconds, 99) * 1000, 3),
+                'max_ms': round(seconds[-1] * 1000, 3),
+            }
+        
+        return {
+            'total': {'wall': round(wall, 4), 'cpu': round(cpu, 4), 'children_cpu': children_cpu},
+            'stages': {name: {'wall': round(w, 4), 'cpu': round(c, 4)}
+                       for name, (w, c) in self.stages.items()},
+            'sql': {
+                'statements': self.sql_statements,
+                'seconds': round(self.sql_seconds, 4),
+                'mean_ms': round(self.sql_seconds / self.sql_statements * 1000, 3)
+                           if self.sql_statements else 0.0,
+            },
+            'templates': templates,
+            'context_hash_seconds': round(self.hash_seconds, 4),
+            'fragments': {'rendered': self.fragments_rendered, 'reused': self.fragments_reused},
+            'writes': {
+                'files': self.files_written,
+                'bytes': self.bytes_written,
+                'seconds': round(self.write_seconds, 4),
+            },
+            'pages': {'rendered': pages_rendered, 'skipped': pages_skipped},
+            'peak_rss_mb': {'self': peak_rss_mb('self'), 'children': peak_rss_mb('children')},
+        }
+    
+    def print_summary(self, report):
+        """Short human-readable version of report()"""
+        print("Build profile:")
+        for name, stage in report['stages'].items():
+            print(f"  {name:<12} {stage['wall']:>8.3f}s wall {stage['cpu']:>8.3f}s cpu")
+        sql = report['sql']
+        print(f"  SQL: {sql['statements']} statements, {sql['seconds']:.3f}s")
+        slowest = sorted(report['templates'].items(), key=lambda item: -item[1]['total'])
+        for template_name, stats in slowest:
+            print(f"  {template_name:<16} {stats['count']:>6} renders, "
+                  f"p50 {stats['p50_ms']:.2f}ms p99 {stats['p99_ms']:.2f}ms")
+        fragments = report['fragments']
+        print(f"  Fragments: {fragments['rendered']} rendered, {fragments['reused']} reused")
+        writes = report['writes']
+        print(f"  Wrote {writes['files']} files, {writes['bytes'] / 1e6:.1f} MB "
+              f"in {writes['seconds']:.3f}s")
+        print(f"  Peak RSS: {report['peak_rss_mb']['self']} MB "
+              f"(workers: {report['peak_rss_mb']['children']} MB)")
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that reports statement counts and time to the connection's profiler"""
+    
+    def _timed(self, method, *args, statements=0):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.connection.profiler.record_sql(time.perf_counter() - start, statements)
+    
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters, statements=1)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters, statements=1)
+    
+    def fetchone(self):
+        return self._timed(super().fetchone)
+    
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, size if size is not None else self.arraysize)
+    
+    def fetchall(self):
+        return self._timed(super().fetchall)
+    
+    def __next__(self):
+        return self._timed(super().__next__)
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors are ProfiledCursors"""
+    profiler = None
+    
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
 class MuseumSiteGenerator:
-    def __init__(self, db_path='museum.db', output_dir='output'):
+    def __init__(self, db_path='museum.db', output_dir='output', incremental=False, jobs=1,
+                 page_size=48, profile=False, compress=False, minify=False, check_plans=False,
+                 sw_cache_size=200):
         self.db_path = db_path
         self.output_dir = Path(output_dir)
         self.templates_dir = Path('templates')
         self.static_dir = Path('static')
+        self.incremental = incremental
+        self.jobs = max(1, jobs)
+        self.page_size = max(1, page_size)
+        self.compress = compress
+        self.minify = minify
+        self.sw_cache_size = max(1, sw_cache_size)
+        self._stylesheet_rules = None
+        self.images = {}  # Local image URL -> derivatives (see process_images)
+        self.assets = {}  # Logical static path -> fingerprinted path
+        self.browse_index_dir = None  # static/browse/<hash>/ (see browse_index_files)
+        self.search_precache = []  # Search shards the service worker precaches
+        
+        # Incremental build state
+        self.manifest = {}       # Previous build: page path -> inputs hash
+        self.new_manifest = {}   # This build: page path -> inputs hash
+        self.pages_rendered = 0
+        self.pages_skipped = 0
+        self._template_hashes = {}
+        self.fragments = collections.OrderedDict()  # fragment() cache key -> markup, oldest first
+        self._summary_select = None
+        self._pool = None  # Render workers, with jobs > 1 (see worker_pool)
+        
+        # Output writer state: every file this build produced (relative paths,
+        # anything else in output/ is pruned), directories already created
+        self.produced = set()
+        self.files_written = 0
+        self.files_unchanged = 0
+        self._dirs = set()
+        
+        # Build instrumentation (--profile-report, --check-query-plans)
+        self.profiler = BuildProfiler() if profile else None
+        self.check_plans = check_plans
+        self.statements = set()  # SQL run on this process's connections
         
         # Setup Jinja2
+        TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
         self.jinja_env = Environment(
             loader=FileSystemLoader(str(self.templates_dir)),
+            bytecode_cache=FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR)),
             autoescape=True
         )
         self.jinja_env.filters['formatdate'] = self.format_date
+        self.jinja_env.globals['asset'] = self.asset
+        self.jinja_env.globals['fragment'] = self.fragment
         
+    def asset(self, path):
+        """Published path of a static file, e.g. asset('static/css/main.css');
+        paths that are not in static/ are returned unchanged"""
+        return self.assets.get(path, path)
+    
+    def fragment(self, *key, caller, base_path=''):
+        """Template call block that renders its body once per key and reuses
+        the markup, e.g. {% call(base_path) fragment('card', record.id,
+        base_path=base_path) %}. The key must cover everything the body
+        depends on except base_path, which the body receives as its argument
+        and is filled in per page"""
+        html = self.fragments.get(key)
+        if self.profiler:
+            self.profiler.record_fragment(html is not None)
+        if html is None:
+            html = self.fragments[key] = Markup(caller(FRAGMENT_BASE_PATH))
+            if len(self.fragments) > FRAGMENT_CACHE_SIZE:
+                self.fragments.popitem(last=False)
+        else:
+            self.fragments.move_to_end(key)
+        return html.replace(FRAGMENT_BASE_PATH, base_path)
+    
     def format_date(self, date_str):
         """Format date string"""
         if not date_str:
@@ -37,28 +627,272 @@ class MuseumSiteGenerator:
             return date_str
     
     def clean_output(self):
-        """Remove old output directory"""
-        if self.output_dir.exists():
-            shutil.rmtree(self.output_dir)
-        self.output_dir.mkdir(parents=True)
-        print(f"✓ Cleaned output directory: {self.output_dir}")
+        """Prepare the output directory. Existing files are kept so unchanged
+        ones are not rewritten; whatever this build does not produce is pruned
+        afterwards (see prune_output)"""
+        if self.incremental and self.output_dir.exists():
+            self.load_manifest()
+            print(f"✓ Incremental build: {len(self.manifest)} pages in manifest")
+            return
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"✓ Output directory: {self.output_dir}")
+        
+    def load_manifest(self):
+        """Load the page manifest written by the previous build"""
+        manifest_path = self.output_dir / MANIFEST_NAME
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f).get('pages', {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            self.manifest = {}
+    
+    def save_manifest(self):
+        """Write the page manifest for the next incremental build"""
+        data = {'pages': dict(sorted(self.new_manifest.items()))}
+        self.write_file(MANIFEST_NAME, json.dumps(data, indent=0))
+    
+    def compress_output(self):
+        """Write .gz (and, with the brotli package, .br) siblings for every
+        compressible file this build produced, in parallel. Siblings newer
+        than their source are kept - unchanged files keep their mtime"""
+        print("Precompressing output...")
+        encoders = [('.gz', gzip_compress)]
+        if brotli:
+            encoders.append(('.br', brotli_compress))
+        else:
+            print("⚠ brotli not installed, writing .gz only (pip install brotli)")
+        
+        def compress(path):
+            source = self.output_dir / path
+            stat = source.stat()
+            if stat.st_size < COMPRESS_MIN_SIZE:
+                return [], 0
+            siblings, written, data = [], 0, None
+            for suffix, encode in encoders:
+                target = source.with_name(source.name + suffix)
+                siblings.append(path + suffix)
+                try:
+                    if target.stat().st_mtime_ns >= stat.st_mtime_ns:
+                        continue
+                except FileNotFoundError:
+                    pass
+                if data is None:
+                    data = source.read_bytes()
+                target.write_bytes(encode(data))
+                written += 1
+            return siblings, written
         
+        sources = sorted(path for path in self.produced | set(self.new_manifest)
+                         if os.path.splitext(path)[1] in COMPRESS_EXTENSIONS
+                         and path != MANIFEST_NAME)
+        written = 0
+        # zlib and brotli release the GIL while compressing
+        with ThreadPoolExecutor(max_workers=max(self.jobs, os.cpu_count() or 1)) as pool:
+            for siblings, count in pool.map(compress, sources):
+                self.produced.update(siblings)
+                written += count
+        print(f"✓ Wrote {written} compressed files "
+              f"({', '.join(suffix for suffix, _ in encoders)}) for {len(sources)} sources")
+    
+    def prune_output(self):
+        """Delete files in output/ this build did not produce (pages of deleted
+        records, old search shards...) and directories left empty"""
+        produced = self.produced | set(self.new_manifest)
+        root = str(self.output_dir)
+        removed = 0
+        for dirpath, _, filenames in os.walk(root, topdown=False):
+            rel_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+            for name in filenames:
+                rel = name if rel_dir == '.' else f"{rel_dir}/{name}"
+                if rel not in produced:
+                    os.unlink(os.path.join(dirpath, name))
+                    removed += 1
+            if dirpath != root and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+        if removed:
+            print(f"✓ Removed {removed} stale files")
+    
+    def template_hash(self, template_name):
+        """Hash a template's source together with every template it extends/includes"""
+        if template_name not in self._template_hashes:
+            h = hashlib.sha256()
+            pending, seen = [template_name], set()
+            while pending:
+                name = pending.pop()
+                if name in seen:
+                    continue
+                seen.add(name)
+                source, _, _ = self.jinja_env.loader.get_source(self.jinja_env, name)
+                h.update(name.encode('utf-8'))
+                h.update(source.encode('utf-8'))
+                ast = self.jinja_env.parse(source)
+                pending.extend(sorted(n for n in meta.find_referenced_templates(ast) if n))
+            self._template_hashes[template_name] = h.hexdigest()
+        return self._template_hashes[template_name]
+    
+    def inputs_hash(self, template_name, context):
+        """Hash everything a page is rendered from"""
+        h = hashlib.sha256()
+        h.update(self.template_hash(template_name).encode('utf-8'))
+        h.update(json.dumps(self.assets, sort_keys=True).encode('utf-8'))
+        h.update(b'minify' if self.minify else b'')
+        h.update(json.dumps(context, sort_keys=True, default=str).encode('utf-8'))
+        return h.hexdigest()
+    
+    def render_page(self, template_name, path, context):
+        """Render a template to path, skipping it if its inputs are unchanged"""
+        start = time.perf_counter()
+        digest = self.inputs_hash(template_name, context)
+        self.new_manifest[path] = digest
+        if self.profiler:
+            self.profiler.hash_seconds += time.perf_counter() - start
+        
+        if (self.incremental and self.manifest.get(path) == digest
+                and (self.output_dir / path).exists()):
+            self.pages_skipped += 1
+            return False
+        
+        start = time.perf_counter()
+        html = self.jinja_env.get_template(template_name).render(**context)
+        if self.minify:
+            html = self.optimize_html(template_name, html, context.get('base_path', ''))
+        if self.profiler:
+            self.profiler.record_render(template_name, time.perf_counter() - start)
+        self.write_file(path, html)
+        self.pages_rendered += 1
+        return True
+        
+    def optimize_html(self, template_name, html, base_path):
+        """Inline critical CSS (CRITICAL_CSS_TEMPLATES) and minify a rendered page"""
+        if template_name in CRITICAL_CSS_TEMPLATES:
+            href = base_path + self.asset('static/css/main.css')
+            link = f'<link rel="stylesheet" href="{href}">'
+            if link in html:
+                css = critical_css(self.stylesheet_rules(), html.split(FOLD_MARKER, 1)[0])
+                html = html.replace(link, (
+                    f'<style>{css}</style>'
+                    f'<link rel="preload" href="{href}" as="style" '
+                    f'onload="this.onload=null;this.rel=\'stylesheet\'">'
+                    f'<noscript>{link}</noscript>'
+                ), 1)
+        return minify_html(html)
+    
+    def stylesheet_rules(self):
+        """Parsed (minified) main.css, for critical CSS extraction"""
+        if self._stylesheet_rules is None:
+            css = (self.static_dir / 'css' / 'main.css').read_text(encoding='utf-8')
+            self._stylesheet_rules = parse_css(minify_css(css))
+        return self._stylesheet_rules
+    
     def copy_static_files(self):
-        """Copy CSS, JS, images to output"""
+        """Copy CSS and JS to output under fingerprinted names, images and
+        other files as they are (unchanged files are left alone)"""
         print("Copying static files...")
         output_static = self.output_dir / 'static'
         if self.static_dir.exists():
-            shutil.copytree(self.static_dir, output_static)
-            print(f"✓ Copied static files to: {output_static}")
+            copied = 0
+            for source in sorted(self.static_dir.rglob('*')):
+                if source.is_file():
+                    path = f"static/{source.relative_to(self.static_dir).as_posix()}"
+                    data = source.read_bytes()
+                    if self.minify and source.suffix in STATIC_MINIFIERS:
+                        data = STATIC_MINIFIERS[source.suffix](data.decode('utf-8')).encode('utf-8')
+                    if source.suffix in FINGERPRINT_EXTENSIONS:
+                        self.assets[path] = fingerprint(path, data)
+                    self.write_file(self.assets.get(path, path), data)
+                    copied += 1
+            print(f"✓ Copied {copied} static files ({len(self.assets)} fingerprinted) to: {output_static}")
         else:
             print("⚠ Static directory not found")
     
-    def get_db_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+    def save_asset_manifest(self):
+        """Write logical -> fingerprinted static paths (and the search and
+        browse data directories)"""
+        if self.browse_index_dir:
+            # Not in self.assets while pages render: every page's inputs
+            # hash covers it, and only browse pages link this data
+            self.assets['static/browse/'] = self.browse_index_dir
+        self.write_file(ASSET_MANIFEST_NAME, json.dumps(dict(sorted(self.assets.items())), indent=2))
+    
+    def generate_service_worker(self):
+        """Write the service worker with this build's precache list. Its
+        version follows the published static files and data directories, so
+        builds that only edit pages keep browsers' caches"""
+        files = sorted(path for logical, path in self.assets.items()
+                       if os.path.splitext(logical)[1] in SW_PRECACHE_EXTENSIONS)
+        files += self.search_precache
+        latest = ['./', 'static/search/meta.json']
+        version = stable_hash(*sorted(self.assets.values()), str(self.sw_cache_size))
+        script = self.jinja_env.get_template(SERVICE_WORKER_NAME).render(
+            version=f"{version:016x}"[:ASSET_HASH_LENGTH], max_entries=self.sw_cache_size,
+            files=files, latest=latest, immutable=SW_IMMUTABLE_PREFIXES)
+        if self.minify:
+            script = minify_js(script)
+        self.write_file(SERVICE_WORKER_NAME, script)
+        print(f"✓ Generated service worker: precaching {len(files) + len(latest)} files")
+    
+    def get_db_connection(self, read_only=False, immutable=True):
+        """Get database connection (read_only: tuned for reading; immutable=False
+        keeps SQLite's locking for a database that may change while it is open)"""
+        factory = ProfiledConnection if self.profiler else sqlite3.Connection
+        if read_only:
+            uri = Path(self.db_path).resolve().as_uri() + ('?mode=ro&immutable=1' if immutable else '?mode=ro')
+            # serve.py uses it from request threads (one at a time)
+            conn = sqlite3.connect(uri, uri=True, factory=factory, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, factory=factory)
+        if self.profiler:
+            conn.profiler = self.profiler
+        if read_only:
+            for pragma, value in SQLITE_PRAGMAS.items():
+                conn.execute(f"PRAGMA {pragma} = {value}")
         conn.row_factory = sqlite3.Row
+        if self.check_plans:
+            conn.set_trace_callback(self.statements.add)
         return conn
     
+    def missing_indexes(self, conn):
+        """Indexes in schema.sql that the database lacks (it was created by an
+        older migrate.py)"""
+        try:
+            schema = Path('schema.sql').read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return []
+        present = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        return [name for name in re.findall(r'CREATE INDEX IF NOT EXISTS (\w+)', schema)
+                if name not in present]
+    
+    def check_query_plans(self, conn):
+        """EXPLAIN QUERY PLAN every SELECT this build ran; returns the ones
+        that scan a whole table and then sort it in a temp B-tree"""
+        conn.set_trace_callback(None)
+        print("Query plans:")
+        slow = []
+        for sql in sorted(self.statements):
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            full_scan = any(step.startswith('SCAN ') and ' USING ' not in step
+                            and 'VIRTUAL TABLE' not in step for step in plan)
+            sort = any(step.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in step
+                       for step in plan)
+            mark = '⚠' if full_scan and sort else '✓'
+            print(f"  {mark} {' '.join(sql.split())[:100]}")
+            for step in plan:
+                print(f"      {step}")
+            if full_scan and sort:
+                slow.append(sql)
+        if slow:
+            print(f"⚠ {len(slow)} queries scan and sort a whole table "
+                  f"(missing index? re-run migrate.py to update indexes and statistics)")
+        else:
+            print("✓ No query scans and sorts a whole table")
+        return slow
+    
+    def stage(self, name):
+        """Context manager timing one build stage when profiling"""
+        return self.profiler.stage(name) if self.profiler else contextlib.nullcontext()
+    
     def get_stats(self, conn):
         """Get museum statistics"""
         cursor = conn.cursor()
@@ -73,23 +907,31 @@ class MuseumSiteGenerator:
         """).fetchone()
         return dict(stats) if stats else {}
     
+    def summary_select(self, conn):
+        """SUMMARY_SELECT, for databases migrated before content_hash existed too"""
+        if self._summary_select is None:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+            self._summary_select = SUMMARY_SELECT
+            if 'content_hash' not in columns:
+                self._summary_select = SUMMARY_SELECT.replace('r.content_hash', 'NULL AS content_hash')
+        return self._summary_select
+    
+    def summaries(self, rows):
+        """RecordSummary for each SUMMARY_SELECT row, as the cursor yields them"""
+        for row in rows:
+            yield RecordSummary(*row, self.images.get(row['primary_image']))
+    
     def get_all_records(self, conn):
-        """Get all records with primary images"""
+        """Stream all records (as RecordSummary), newest first"""
         cursor = conn.cursor()
-        records = cursor.execute("""
-            SELECT r.*,
-                   (SELECT url FROM media WHERE record_id = r.id AND is_primary = 1 LIMIT 1) as primary_image
-            FROM records r
-            ORDER BY date_added DESC
-        """).fetchall()
-        return [dict(r) for r in records]
+        yield from self.summaries(cursor.execute(self.summary_select(conn) + " ORDER BY date_added DESC"))
     
     def get_featured_records(self, conn, limit=2):
         """Get featured records"""
         cursor = conn.cursor()
         records = cursor.execute("""
             SELECT r.*,
-                   (SELECT url FROM media WHERE record_id = r.id AND is_primary = 1 LIMIT 1) as primary_image
+                   (SELECT url FROM media WHERE record_id = r.id AND is_primary = 1 ORDER BY id LIMIT 1) as primary_image
             FROM records r
             WHERE featured = 1
             ORDER BY featured_order, date_added DESC
@@ -100,295 +942,739 @@ class MuseumSiteGenerator:
     def get_recent_records(self, conn, limit=8):
         """Get recent records"""
         cursor = conn.cursor()
-        records = cursor.execute("""
-            SELECT r.*,
-                   (SELECT url FROM media WHERE record_id = r.id AND is_primary = 1 LIMIT 1) as primary_image
-            FROM records r
-            ORDER BY date_added DESC
-            LIMIT ?
-        """, (limit,)).fetchall()
-        return [dict(r) for r in records]
+        rows = cursor.execute(self.summary_select(conn) + " ORDER BY date_added DESC LIMIT ?", (limit,))
+        return list(self.summaries(rows))
     
-    def get_record_with_media(self, conn, record_id):
-        """Get single record with all media"""
-        cursor = conn.cursor()
+    def process_images(self, conn):
+        """Resize locally stored media images to IMAGE_WIDTHS in AVIF/WebP plus
+        a JPEG/PNG fallback, cached in .cache/images/<source hash>/, and copy
+        them to static/img/; YouTube posters get the same treatment (see
+        process_posters). Fills self.images (media URL -> derivatives), which
+        preload() attaches to records so templates can emit
+        srcset/sizes/width/height"""
+        urls = sorted({
+            url for (url,) in conn.execute("SELECT DISTINCT url FROM media WHERE type = 'image'")
+            if is_local_image(url)
+        })
+        videos = {}  # YouTube id -> media URLs
+        for (url,) in conn.execute("SELECT DISTINCT url FROM media WHERE type = 'youtube'"):
+            if youtube_id(url):
+                videos.setdefault(youtube_id(url), []).append(url)
+        if not urls and not videos:
+            return
+        if Image is None:
+            print(f"⚠ Pillow not installed, {len(urls)} local images used as-is "
+                  f"and video posters hotlinked (pip install Pillow)")
+            return
         
-        record = cursor.execute("SELECT * FROM records WHERE id = ?", (record_id,)).fetchone()
-        if not record:
-            return None
-        
-        media = cursor.execute("""
-            SELECT * FROM media 
-            WHERE record_id = ? 
-            ORDER BY display_order, id
-        """, (record_id,)).fetchall()
-        
-        result = dict(record)
-        result['media'] = [dict(m) for m in media]
-        
-        # Handle badges (may or may not exist)
-        try:
-            result['badges'] = json.loads(record['badges']) if record['badges'] else []
-        except (KeyError, IndexError):
-            result['badges'] = []
-        
-        # Handle tags (may or may not exist)
-        try:
-            result['tags'] = json.loads(record['tags']) if record['tags'] else []
-        except (KeyError, IndexError):
-            result['tags'] = []
+        Image.init()
+        formats = [fmt for fmt in IMAGE_FORMATS if fmt.upper() in Image.SAVE]
+        encoded = 0
+        for url in urls:
+            source = Path(url.lstrip('/'))
+            if not source.is_file():
+                print(f"⚠ Image not found: {url}")
+                continue
+            self.images[url], reencoded = self.derivatives(source, IMAGE_CACHE_DIR, formats)
+            encoded += reencoded
+        if urls:
+            print(f"✓ Images: {len(self.images)} local images, {encoded} (re)encoded, "
+                  f"formats: {', '.join(formats + ['fallback'])}")
+        if videos:
+            self.process_posters(videos, formats)
+    
+    def process_posters(self, videos, formats):
+        """Fetch (once) and publish a poster for each YouTube video
+        ({id: media URLs}); video facades hotlink the ones this cannot get"""
+        poster_dir = IMAGE_CACHE_DIR / 'youtube'
+        missing = [video_id for video_id in sorted(videos)
+                   if not (poster_dir / video_id / 'poster.jpg').exists()
+                   and not (poster_dir / video_id / 'none').exists()]
+        offline = False
+        if missing:
+            # One request first: offline builds should not wait on every timeout
+            first = fetch_poster(missing[0], poster_dir / missing[0] / 'poster.jpg')
+            offline = first is None
+            results = [first]
+            if not offline:
+                with ThreadPoolExecutor(max_workers=POSTER_FETCH_THREADS) as pool:
+                    results += pool.map(lambda video_id: fetch_poster(
+                        video_id, poster_dir / video_id / 'poster.jpg'), missing[1:])
+            for video_id, result in zip(missing, results):
+                if result is False:
+                    # YouTube has no such video: don't ask again
+                    (poster_dir / video_id).mkdir(parents=True, exist_ok=True)
+                    (poster_dir / video_id / 'none').touch()
         
-        # Handle chain of custody (may or may not exist)
+        published = 0
+        for video_id, urls in sorted(videos.items()):
+            source = poster_dir / video_id / 'poster.jpg'
+            if source.exists():
+                variants, _ = self.derivatives(source, poster_dir, formats, key=video_id)
+                for url in urls:
+                    self.images[url] = variants
+                published += 1
+        print(f"✓ Video posters: {published} of {len(videos)} cached locally"
+              + (" (YouTube unreachable, the rest are hotlinked)" if offline else ""))
+    
+    def derivatives(self, source, cache_root, formats, key=None):
+        """Derivatives of one image (encoded into cache_root/<key or content
+        hash>/ unless already there) copied to static/img/: (variants for
+        self.images, whether they had to be encoded)"""
+        digest = hashlib.sha256(source.read_bytes()).hexdigest()[:16]
+        cache_dir = cache_root / (key or digest)
+        info_path = cache_dir / 'info.json'
+        encoded = False
         try:
-            result['chain_of_custody'] = json.loads(record['chain_of_custody']) if record['chain_of_custody'] else []
-        except (KeyError, IndexError):
-            result['chain_of_custody'] = []
+            info = json.loads(info_path.read_text(encoding='utf-8'))
+            if info.get('digest', digest) != digest:
+                raise FileNotFoundError
+            if not all((cache_dir / v['file']).exists() for v in info['variants']):
+                raise FileNotFoundError
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            info = self.encode_derivatives(source, cache_dir, formats)
+            info['digest'] = digest
+            info_path.write_text(json.dumps(info), encoding='utf-8')
+            encoded = True
         
-        return result
+        sources, fallback = {}, []
+        for variant in info['variants']:
+            path = f"static/img/{digest}-{variant['file']}"
+            self.write_file(path, (cache_dir / variant['file']).read_bytes())
+            entry = {'src': path, 'width': variant['width'], 'height': variant['height']}
+            if variant['format'] in IMAGE_FORMATS:
+                sources.setdefault(variant['format'], []).append(entry)
+            else:
+                fallback.append(entry)
+        largest = fallback[-1]
+        return {
+            'src': largest['src'],
+            'width': largest['width'],
+            'height': largest['height'],
+            'thumb': fallback[0],
+            'srcset': fallback,
+            'sources': [{'type': f"image/{fmt}", 'srcset': sources[fmt]}
+                        for fmt in IMAGE_FORMATS if fmt in sources],
+        }, encoded
     
-    def get_related_records(self, conn, record_id, game, organization, brand):
-        """Get related records"""
-        cursor = conn.cursor()
-        related = cursor.execute("""
-            SELECT r.*,
-                   (SELECT url FROM media WHERE record_id = r.id AND is_primary = 1 LIMIT 1) as primary_image
-            FROM records r
-            WHERE id != ? 
-            AND (game = ? OR organization = ? OR brand = ?)
-            ORDER BY RANDOM()
-            LIMIT 4
-        """, (record_id, game or '', organization or '', brand or '')).fetchall()
-        return [dict(r) for r in related]
-    
-    def get_steward_info(self, conn, username):
-        """Get steward information"""
-        cursor = conn.cursor()
-        steward = cursor.execute("""
-            SELECT * FROM stewards WHERE username = ?
-        """, (username,)).fetchone()
-        return dict(steward) if steward else {'username': username}
+    def encode_derivatives(self, source, cache_dir, formats):
+        """Write every width/format derivative of one image into cache_dir"""
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            # Palette/CMYK/16-bit sources: resize and encode in RGB(A)
+            image = image.convert('RGBA' if image.mode == 'P' or 'A' in image.mode else 'RGB')
+        fallback = 'png' if image.mode in ('RGBA', 'LA') else 'jpeg'
+        
+        # Never upscale: widths past the original collapse into the original size
+        widths = sorted({min(width, image.width) for width in IMAGE_WIDTHS})
+        variants = []
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt in formats + [fallback]:
+                name = f"{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+                (cache_dir / name).write_bytes(encode_image(resized, fmt))
+                variants.append({'file': name, 'format': fmt, 'width': width, 'height': height})
+        return {'width': image.width, 'height': image.height, 'variants': variants}
     
-    def get_steward_records(self, conn, username):
-        """Get all records by steward"""
+    def preload(self, conn):
+        """Load the listing data every page draws on (RecordSummary rows,
+        stewards, browse and related-record indexes) in a few streamed
+        queries; full records are streamed later by iter_records()"""
         cursor = conn.cursor()
-        records = cursor.execute("""
-            SELECT r.*,
-                   (SELECT url FROM media WHERE record_id = r.id AND is_primary = 1 LIMIT 1) as primary_image
-            FROM records r
-            WHERE steward = ?
-            ORDER BY date_added DESC
-        """, (username,)).fetchall()
-        return [dict(r) for r in records]
+        
+        self.records = list(self.get_all_records(conn))  # Newest first
+        self.records_by_steward = {}
+        for record in self.records:
+            self.records_by_steward.setdefault(record.steward, []).append(record)
+        
+        self.steward_info = {
+            s['username']: dict(s) for s in cursor.execute("SELECT * FROM stewards")
+        }
+        
+        self.build_related_index()
+        self.build_browse_facets()
     
-    def get_all_stewards(self, conn):
-        """Get all unique stewards"""
-        cursor = conn.cursor()
-        stewards = cursor.execute("""
-            SELECT DISTINCT steward FROM records ORDER BY steward
-        """).fetchall()
-        return [s['steward'] for s in stewards]
+    def iter_records(self, conn, first=None, last=None):
+        """Full records (all columns, media, decoded JSON fields) in id order,
+        optionally limited to ids first..last. The records and media cursors
+        are merge-joined on id, so only the current record is in memory"""
+        where, params = '', ()
+        if first is not None:
+            where, params = 'WHERE {} BETWEEN ? AND ?', (first, last)
+        records = conn.cursor().execute(
+            f"SELECT * FROM records {where.format('id')} ORDER BY id", params)
+        media = conn.cursor().execute(
+            f"SELECT * FROM media {where.format('record_id')} ORDER BY record_id, display_order, id",
+            params)
+        
+        pending = next(media, None)
+        for row in records:
+            record = dict(row)
+            record['media'] = []
+            while pending is not None and pending['record_id'] <= row['id']:
+                if pending['record_id'] == row['id']:
+                    item = dict(pending)
+                    # Images and YouTube posters (see process_images)
+                    item['variants'] = self.images.get(item['url'])
+                    if item['type'] == 'youtube':
+                        item['video_id'] = youtube_id(item['url'])
+                        item['poster'] = item['video_id'] and YOUTUBE_POSTER_URL.format(item['video_id'])
+                    record['media'].append(item)
+                pending = next(media, None)
+            record['badges'] = json.loads(row['badges']) if row['badges'] else []
+            record['tags'] = json.loads(row['tags']) if row['tags'] else []
+            record['chain_of_custody'] = json.loads(row['chain_of_custody']) if row['chain_of_custody'] else []
+            yield record
     
-    def get_filtered_records(self, conn, item_type='all', game='all', era='all'):
-        """Get filtered records"""
-        cursor = conn.cursor()
+    def build_browse_facets(self):
+        """Sort records into browse order and bucket them for the prerendered
+        browse pages (everything, and each single type/game/era) in one pass.
         
-        query = """
-            SELECT r.*,
-                   (SELECT url FROM media WHERE record_id = r.id AND is_primary = 1 LIMIT 1) as primary_image
-            FROM records r
-            WHERE 1=1
+        Each record is appended to the list of every page it belongs on, so
+        every list comes out already sorted. browse_facets lists the filter
+        groups (BROWSE_GROUPS) with the values that occur in each.
         """
-        params = []
+        # ORDER BY display_priority DESC, date_added DESC (self.records is
+        # already newest first, and the sort is stable)
+        self.browse_order = sorted(self.records, key=lambda r: (r.display_priority is None,
+                                                                 -(r.display_priority or 0)))
+        self.browse_lists = {}
+        for record in self.browse_order:
+            era = era_of(record.year)
+            keys = [('all', 'all', 'all'), (record.item_type, 'all', 'all'), ('all', record.game, 'all')]
+            if era:
+                keys.append(('all', 'all', era))
+            for key in keys:
+                self.browse_lists.setdefault(key, []).append(record)
         
-        if item_type != 'all':
-            query += " AND item_type = ?"
-            params.append(item_type)
+        present = {key: set() for key, _, _ in BROWSE_GROUPS}
+        for record in self.records:
+            for key, value in browse_values(record).items():
+                if value is not None:
+                    present[key].add(value)
         
-        if game != 'all':
-            query += " AND game = ?"
-            params.append(game)
+        def known_first(values, labels):
+            # Known values in their label order, then anything else by name
+            return [v for v in labels if v in values] + sorted(values - set(labels), key=str.lower)
         
-        if era != 'all':
-            if era == 'golden':
-                query += " AND year <= 2015"
-            elif era == 'global':
-                query += " AND year > 2015 AND year <= 2020"
-            elif era == 'modern':
-                query += " AND year > 2020"
+        options = {
+            'type': [(t, ITEM_TYPE_LABELS.get(t, t.title()))
+                     for t in known_first(present['type'], ITEM_TYPE_LABELS)],
+            'game': [(g, GAME_LABELS.get(g, g)) for g in sorted(present['game'], key=str.lower)],
+            'era': ERAS,
+            'rarity': [(r, RARITY_LABELS.get(r, r)) for r in known_first(present['rarity'], RARITY_LABELS)],
+            'condition': [(c, CONDITION_LABELS.get(c, c))
+                          for c in known_first(present['condition'], CONDITION_LABELS)],
+            'org': [(o, o) for o in sorted(present['org'], key=str.lower)],
+            'verified': [('verified', 'Verified')],
+        }
+        self.browse_facets = [
+            {
+                'key': key,
+                'label': label,
+                'any_label': any_label,
+                'pages': key in BROWSE_PAGE_GROUPS,
+                'options': [{'value': value, 'slug': slugify(value), 'label': option_label}
+                            for value, option_label in options[key]],
+            }
+            for key, label, any_label in BROWSE_GROUPS
+            if options[key]
+        ]
+    
+    def build_related_index(self):
+        """Build inverted indexes (attribute value -> records) for related records.
         
-        query += " ORDER BY display_priority DESC, date_added DESC"
+        Each posting list is ordered by a seeded hash of the record id, so a
+        record's candidates from a huge list (e.g. every Halo item) are the
+        RELATED_WINDOW records following it in that order: bounded work per
+        record, different neighbours for different records, same every build.
+        """
+        self.related_postings = {}   # (field, value) -> [(hash, record), ...]
+        self.related_keys = {}       # record id -> [(field, value), ...]
+        self.related_key_sets = {}   # record id -> frozenset of the same
+        for record in self.records:
+            keys = [(field, getattr(record, field)) for field in RELATED_WEIGHTS
+                    if field != 'tag' and getattr(record, field)]
+            tags = json.loads(record.tags) if record.tags else []
+            keys.extend(sorted({('tag', str(tag).lower()) for tag in tags if tag}))
+            self.related_keys[record.id] = keys
+            self.related_key_sets[record.id] = frozenset(keys)
+            entry = (stable_hash(RELATED_SEED, record.id), record)
+            for key in keys:
+                self.related_postings.setdefault(key, []).append(entry)
         
-        records = cursor.execute(query, params).fetchall()
-        return [dict(r) for r in records]
+        for postings in self.related_postings.values():
+            postings.sort(key=lambda entry: (entry[0], entry[1].id))
+    
+    def related_records(self, record, limit=4):
+        """Top related records: scored by shared attributes, ties broken by
+        the seeded hashes so the pick is stable across builds"""
+        record_id = record['id']
+        own_hash = stable_hash(RELATED_SEED, record_id)
+        
+        scores = {}      # other id -> summed RELATED_WEIGHTS of shared keys
+        candidates = {}  # other id -> (seeded hash, record)
+        large = []       # Keys whose posting list is only sampled
+        for key in self.related_keys.get(record_id, []):
+            postings = self.related_postings[key]
+            if len(postings) <= RELATED_WINDOW + 1:
+                weight = RELATED_WEIGHTS[key[0]]
+                for entry in postings:
+                    scores[entry[1].id] = scores.get(entry[1].id, 0) + weight
+                    candidates[entry[1].id] = entry
+                continue
+            large.append(key)
+            start = bisect.bisect_right(postings, own_hash, key=lambda entry: entry[0])
+            for i in range(RELATED_WINDOW):
+                entry = postings[(start + i) % len(postings)]
+                candidates[entry[1].id] = entry
+        candidates.pop(record_id, None)
+        
+        # Sampled keys count for every candidate that has them
+        for key in large:
+            weight = RELATED_WEIGHTS[key[0]]
+            for other_id in candidates:
+                if key in self.related_key_sets[other_id]:
+                    scores[other_id] = scores.get(other_id, 0) + weight
+        
+        # XOR with this record's hash: ties go to different records per page
+        best = heapq.nsmallest(limit, candidates, key=lambda other_id: (
+            -scores[other_id], candidates[other_id][0] ^ own_hash, other_id))
+        return [candidates[other_id][1] for other_id in best]
     
     def write_file(self, path, content):
-        """Write content to file"""
+        """Write content (str or bytes) to file, leaving the file untouched -
+        same inode, same mtime - when it already holds exactly that content"""
+        start = time.perf_counter()
+        data = content.encode('utf-8') if isinstance(content, str) else content
         file_path = self.output_dir / path
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self.produced.add(path)
+        
+        try:
+            if file_path.stat().st_size == len(data):
+                with open(file_path, 'rb') as f:
+                    if f.read() == data:
+                        self.files_unchanged += 1
+                        return False
+        except FileNotFoundError:
+            pass
+        
+        parent = file_path.parent
+        if parent not in self._dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(parent)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        self.files_written += 1
+        if self.profiler:
+            self.profiler.record_write(len(data), time.perf_counter() - start)
+        return True
+    
+    def home_page(self, conn):
+        """Build (template, path, context) for the homepage"""
+        featured = self.get_featured_records(conn)
+        for record in featured:
+            record['primary_image_variants'] = self.images.get(record['primary_image'])
+        context = {
+            'stats': self.get_stats(conn),
+            'featured': featured,
+            'recent': self.get_recent_records(conn),
+            'base_path': ''  # Root level, no prefix
+        }
+        return 'index.html', 'index.html', context
     
     def generate_homepage(self, conn):
         """Generate homepage"""
         print("Generating homepage...")
+        self.render_page(*self.home_page(conn))
+        print("✓ Generated: index.html")
+    
+    def browse_dir(self, item_type, game, era):
+        """Directory of a browse filter combination, e.g. browse/type-jersey-era-modern/"""
+        parts = []
+        if item_type != 'all':
+            parts.append(f"type-{slugify(item_type)}")
+        if game != 'all':
+            parts.append(f"game-{slugify(game)}")
+        if era != 'all':
+            parts.append(f"era-{era}")
         
-        template = self.jinja_env.get_template('index.html')
+        return f"browse/{'-'.join(parts)}/" if parts else 'browse/'
+    
+    def browse_keys(self):
+        """Every prerendered browse filter (sorted) and every page of them, as
+        (item_type, game, era, page) keys for browse_page()"""
+        combinations = set(self.browse_lists)
+        combinations.add(('all', 'all', 'all'))
+        # Single-facet pages are linked from the nav and filter chips, so they
+        # always exist (as a redirect to browse/empty/ when nothing matches)
+        combinations.update((item_type, 'all', 'all') for item_type in ITEM_TYPE_LABELS)
+        combinations.update(('all', 'all', era) for era, _ in ERAS)
+        combinations = sorted(combinations)
         
+        # Pages in browse order of their first record: a record's cards on
+        # the all/type/game/era lists render close together, while they are
+        # still in the fragment cache
+        position = {record.id: i for i, record in enumerate(self.browse_order)}
+        pages = []
+        for facets in combinations:
+            records = self.browse_lists.get(facets, [])
+            for page in range(1, max(1, -(-len(records) // self.page_size)) + 1):
+                first = records[(page - 1) * self.page_size] if records else None
+                pages.append((position[first.id] if first else -1, facets + (page,)))
+        pages.sort()
+        return combinations, [key for _, key in pages]
+    
+    def browse_page(self, conn, facets):
+        """Build (template, path, context) for one page of a browse filter combination"""
+        item_type, game, era, page = facets
+        browse_dir = self.browse_dir(item_type, game, era)
+        path = page_dir(browse_dir, page) + 'index.html'
+        base_path = base_path_for(path)
+        
+        records = self.browse_lists.get((item_type, game, era), [])
+        if browse_dir != 'browse/' and not records:
+            # Linked from navigation but nothing matches: point at the shared empty page
+            return 'redirect.html', path, {'target': f"{base_path}browse/empty/"}
+        
+        pages = max(1, -(-len(records) // self.page_size))
+        start = (page - 1) * self.page_size
         context = {
-            'stats': self.get_stats(conn),
-            'featured': self.get_featured_records(conn),
-            'recent': self.get_recent_records(conn),
-            'base_path': ''  # Root level, no prefix
+            'records': records[start:start + self.page_size],
+            'total_records': len(records),
+            'pagination': {
+                'page': page,
+                'pages': pages,
+                'prev_url': page_dir(browse_dir, page - 1) if page > 1 else None,
+                'next_url': page_dir(browse_dir, page + 1) if page < pages else None,
+            },
+            'facets': self.browse_facets,
+            'selected': {key: value for key, value in zip(BROWSE_PAGE_GROUPS, (item_type, game, era))
+                         if value != 'all'},
+            'browse_index': self.browse_index_dir,
+            'page_size': self.page_size,
+            'base_path': base_path
+        }
+        return 'browse.html', path, context
+    
+    def record_page(self, record):
+        """Build (template, path, context) for one record page (a full
+        record from iter_records)"""
+        context = {
+            'record': record,
+            'related': self.related_records(record),
+            'base_path': '../../'  # Two levels deep: /record/CE-001/
+        }
+        return 'record.html', f"record/{record['id']}/index.html", context
+    
+    def steward_page(self, conn, username):
+        """Build (template, path, context) for one steward profile page"""
+        context = {
+            'steward': self.steward_info.get(username, {'username': username}),
+            'records': self.records_by_steward.get(username, []),
+            'base_path': '../../'  # Two levels deep: /steward/username/
         }
+        return 'steward.html', f"steward/{username}/index.html", context
+    
+    def build_pages(self, conn, kind, keys):
+        """(template, path, context) for each page, built as it is needed.
+        Record pages take sorted ids and stream their records"""
+        if kind == 'record':
+            for record in self.iter_records(conn, keys[0], keys[-1]) if keys else ():
+                yield self.record_page(record)
+            return
+        build_page = getattr(self, f"{kind}_page")
+        for key in keys:
+            yield build_page(conn, key)
+    
+    def render_pages(self, conn, kind, keys):
+        """Render every page of one kind ('record', 'steward', 'browse'),
+        serially or spread over a process pool when jobs > 1"""
+        if self.jobs <= 1 or len(keys) < 2:
+            for page in self.build_pages(conn, kind, keys):
+                self.render_page(*page)
+            return
         
-        html = template.render(**context)
-        self.write_file('index.html', html)
-        print("✓ Generated: index.html")
+        # Small chunks keep workers busy when page costs are uneven
+        chunk_size = max(1, len(keys) // (self.jobs * 4))
+        chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+        for result in self.worker_pool().map(_render_chunk, [kind] * len(chunks), chunks):
+            self.new_manifest.update(result['pages'])
+            self.pages_rendered += result['rendered']
+            self.pages_skipped += result['skipped']
+            self.files_written += result['written']
+            self.files_unchanged += result['unchanged']
+            if result['profile']:
+                self.profiler.merge(result['profile'])
+    
+    def worker_pool(self):
+        """Process pool shared by every render_pages() call of a build, started
+        on first use (once the browse data exists) so each worker preloads
+        the catalogue once; see close_worker_pool()"""
+        if self._pool is None:
+            settings = {
+                'db_path': self.db_path,
+                'output_dir': str(self.output_dir),
+                'incremental': self.incremental,
+                'page_size': self.page_size,
+                'profile': self.profiler is not None,
+                'minify': self.minify,
+            }
+            init_args = (settings, self.manifest, self.images, self.assets, self.browse_index_dir)
+            self._pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker,
+                                             initargs=init_args)
+        return self._pool
+    
+    def close_worker_pool(self):
+        """Stop the render workers (and free their copies of the catalogue)"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
     
     def generate_browse_pages(self, conn):
-        """Generate browse pages for all filter combinations"""
+        """Generate the client-side browsing data, then the prerendered browse
+        pages (all records, and each single type/game/era that has records)"""
         print("Generating browse pages...")
         
-        template = self.jinja_env.get_template('browse.html')
+        self.browse_index_dir, files = self.browse_index_files()
+        for path, content in files.items():
+            self.write_file(path, content)
         
-        item_types = ['all', 'jersey', 'hardware', 'peripheral', 'signature', 'media', 'other']
-        games = ['all', 'Call of Duty', 'Halo', 'Counter-Strike', 'Valorant', 'League of Legends', 'Rocket League']
-        eras = ['all', 'golden', 'global', 'modern']
+        combinations, pages = self.browse_keys()
+        self.render_pages(conn, 'browse', pages)
+        self.render_page(*self.empty_browse_page())
         
-        pages_generated = 0
+        empty = sum(1 for facets in combinations if facets not in self.browse_lists)
+        print(f"✓ Generated {len(pages) - empty} browse pages "
+              f"({len(combinations) - empty} filters), {empty} empty redirects")
+    
+    def browse_index_files(self):
+        """Build the data static/js/browse.js filters with: (index directory,
+        {output path: JSON}) with these files under static/browse/<hash>/:
         
-        # Generate main browse page
+        facets.json   - record ids in browse order and, for each filter group
+                        (BROWSE_GROUPS), its values (slug, label) and one
+                        bitset per value marking the records that have it
+                        (see bitset()); any mix of filters is a few AND/ORs
+        cards/N.json  - card data ([name, game, steward, image]) for records
+                        N*chunk .. N*chunk+chunk-1 in browse order
+        """
+        positions = {}  # (group key, value) -> browse positions
+        for n, record in enumerate(self.browse_order):
+            for key, value in browse_values(record).items():
+                if value is not None:
+                    positions.setdefault((key, value), []).append(n)
+        
+        count = len(self.browse_order)
+        facets = {
+            'count': count,
+            'chunk': BROWSE_CARD_CHUNK,
+            'ids': [record.id for record in self.browse_order],
+            'groups': [
+                {
+                    'key': group['key'],
+                    'values': [option['slug'] for option in group['options']],
+                    'labels': [option['label'] for option in group['options']],
+                    'bits': [bitset(positions.get((group['key'], option['value']), ()), count)
+                             for option in group['options']],
+                }
+                for group in self.browse_facets
+            ],
+        }
+        files = {'facets.json': compact_json(facets)}
+        
+        cards = [
+            [record.name, record.game, record.steward,
+             record.primary_image_variants['thumb']['src'] if record.primary_image_variants
+             else record.primary_image]
+            for record in self.browse_order
+        ]
+        for start in range(0, count, BROWSE_CARD_CHUNK):
+            chunk = cards[start:start + BROWSE_CARD_CHUNK]
+            files[f"cards/{start // BROWSE_CARD_CHUNK}.json"] = compact_json(chunk)
+        
+        # Any change to the data moves it to a new directory
+        h = hashlib.sha256()
+        for path in sorted(files):
+            h.update(path.encode('utf-8'))
+            h.update(files[path].encode('utf-8'))
+        index_dir = f"static/browse/{h.hexdigest()[:ASSET_HASH_LENGTH]}/"
+        return index_dir, {index_dir + path: content for path, content in files.items()}
+    
+    def empty_browse_page(self):
+        """Build (template, path, context) for browse/empty/, where filter
+        combinations without records redirect"""
         context = {
-            'records': self.get_filtered_records(conn),
-            'item_type': 'all',
-            'game': 'all',
-            'era': 'all',
-            'base_path': '../'  # One level deep
+            'records': [],
+            'total_records': 0,
+            'pagination': {'page': 1, 'pages': 1, 'prev_url': None, 'next_url': None},
+            'facets': self.browse_facets,
+            'selected': {},
+            'browse_index': self.browse_index_dir,
+            'page_size': self.page_size,
+            'base_path': '../../'
         }
-        html = template.render(**context)
-        self.write_file('browse/index.html', html)
-        pages_generated += 1
-        
-        # Generate filtered pages
-        for item_type in item_types:
-            for game in games:
-                for era in eras:
-                    if item_type == 'all' and game == 'all' and era == 'all':
-                        continue  # Already generated
-                    
-                    records = self.get_filtered_records(conn, item_type, game, era)
-                    
-                    context = {
-                        'records': records,
-                        'item_type': item_type,
-                        'game': game,
-                        'era': era,
-                        'base_path': '../../'  # Two levels deep
-                    }
-                    
-                    html = template.render(**context)
-                    
-                    # Create path
-                    parts = []
-                    if item_type != 'all':
-                        parts.append(f"type-{item_type}")
-                    if game != 'all':
-                        game_slug = game.lower().replace(' ', '-')
-                        parts.append(f"game-{game_slug}")
-                    if era != 'all':
-                        parts.append(f"era-{era}")
-                    
-                    if parts:
-                        path = f"browse/{'-'.join(parts)}/index.html"
-                        self.write_file(path, html)
-                        pages_generated += 1
-        
-        print(f"✓ Generated {pages_generated} browse pages")
+        return 'browse.html', 'browse/empty/index.html', context
     
     def generate_record_pages(self, conn):
         """Generate individual record pages"""
         print("Generating record pages...")
         
-        template = self.jinja_env.get_template('record.html')
-        records = self.get_all_records(conn)
-        
-        for record in records:
-            record_data = self.get_record_with_media(conn, record['id'])
-            related = self.get_related_records(
-                conn, 
-                record['id'],
-                record.get('game'),
-                record.get('organization'),
-                record.get('brand')
-            )
-            
-            context = {
-                'record': record_data,
-                'related': related,
-                'base_path': '../../'  # Two levels deep: /record/CE-001/
-            }
-            
-            html = template.render(**context)
-            self.write_file(f"record/{record['id']}/index.html", html)
+        record_ids = sorted(record.id for record in self.records)
+        self.render_pages(conn, 'record', record_ids)
         
-        print(f"✓ Generated {len(records)} record pages")
+        print(f"✓ Generated {len(record_ids)} record pages")
     
     def generate_steward_pages(self, conn):
         """Generate steward profile pages"""
         print("Generating steward pages...")
         
-        template = self.jinja_env.get_template('steward.html')
-        stewards = self.get_all_stewards(conn)
-        
-        for username in stewards:
-            steward_info = self.get_steward_info(conn, username)
-            records = self.get_steward_records(conn, username)
-            
-            context = {
-                'steward': steward_info,
-                'records': records,
-                'base_path': '../../'  # Two levels deep: /steward/username/
-            }
-            
-            html = template.render(**context)
-            self.write_file(f"steward/{username}/index.html", html)
+        stewards = sorted(self.records_by_steward)
+        self.render_pages(conn, 'steward', stewards)
         
         print(f"✓ Generated {len(stewards)} steward pages")
     
+    def about_page(self):
+        """Build (template, path, context) for the about page"""
+        context = {'base_path': '../'}  # One level deep: /about/
+        return 'about.html', 'about/index.html', context
+    
     def generate_about_page(self):
         """Generate about page"""
         print("Generating about page...")
-        
-        template = self.jinja_env.get_template('about.html')
-        context = {'base_path': '../'}  # One level deep: /about/
-        html = template.render(**context)
-        self.write_file('about/index.html', html)
+        self.render_page(*self.about_page())
         print("✓ Generated: about/index.html")
     
-    def generate_search_json(self, conn):
-        """Generate search index JSON"""
+    def fts_postings(self, conn, ordinals):
+        """term -> {ordinal: relevance} straight from the records_fts index.
+        
+        fts5vocab lists every term FTS5's tokenizer produced; joining it back
+        against records_fts with MATCH gives each (term, record) pair its
+        bm25() score in a single statement.
+        """
+        cursor = conn.cursor()
+        by_rowid = {
+            rowid: ordinals[record_id]
+            for rowid, record_id in cursor.execute("SELECT rowid, id FROM records")
+        }
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS temp.search_vocab
+            USING fts5vocab(main, records_fts, row)
+        """)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS.values())
+        
+        postings = {}
+        for term, rowid, rank in cursor.execute(f"""
+            SELECT v.term, f.rowid, bm25(records_fts, {weights})
+            FROM temp.search_vocab v
+            JOIN records_fts f ON records_fts MATCH '"' || v.term || '"'
+            WHERE length(v.term) >= ?
+        """, (SEARCH_MIN_TOKEN,)):
+            ordinal = by_rowid.get(rowid)
+            if ordinal is not None:
+                # bm25() is negative, more negative = more relevant
+                postings.setdefault(term, {})[ordinal] = -rank
+        return postings
+    
+    def search_postings(self, conn):
+        """term -> {ordinal: relevance} for every searchable record"""
+        ordinals = {record.id: n for n, record in enumerate(self.records)}
+        try:
+            postings = self.fts_postings(conn, ordinals)
+            source = 'records_fts'
+        except sqlite3.OperationalError as e:
+            # No FTS5 in this SQLite build, or a database without records_fts
+            print(f"⚠ FTS5 index unavailable ({e}), tokenizing records instead")
+            postings = {}
+            rows = conn.cursor().execute(f"SELECT id, {', '.join(SEARCH_FIELDS)} FROM records")
+            for row in rows:
+                ordinal = ordinals[row['id']]
+                for field in SEARCH_FIELDS:
+                    for term in search_tokens(row[field] or ''):
+                        if len(term) >= SEARCH_MIN_TOKEN:
+                            postings.setdefault(term, {})[ordinal] = 1.0
+            source = 'records'
+        
+        # Record ids are UNINDEXED in records_fts; an id hit ranks with the best
+        top_score = max((max(scores.values()) for scores in postings.values()), default=1.0)
+        for ordinal, record in enumerate(self.records):
+            for term in search_tokens(record.id):
+                if len(term) >= SEARCH_MIN_TOKEN:
+                    postings.setdefault(term, {})[ordinal] = top_score
+        return postings, source
+    
+    def generate_search_index(self, conn):
+        """Generate the search index files (see search_index_files)"""
         print("Generating search index...")
+        index_dir, files = self.search_index_files(conn)
+        for path, content in files.items():
+            self.write_file(path, content)
+        self.assets['static/search/'] = index_dir
+        
+        shards = sorted(path for path in files if path.startswith(index_dir + 'shards/'))
+        if sum(len(files[path].encode('utf-8')) for path in shards) <= SW_PRECACHE_SEARCH_BYTES:
+            self.search_precache = shards
+    
+    def search_index_files(self, conn):
+        """Build the sharded search index: (index directory, {output path: JSON})
+        with these files under static/search/:
         
-        records = self.get_all_records(conn)
-        search_data = []
-        
-        for record in records:
-            search_data.append({
-                'id': record['id'],
-                'name': record['name'],
-                'description': record['description'],
-                'item_type': record['item_type'],
-                'game': record['game'],
-                'steward': record['steward'],
-                'organization': record.get('organization'),
-                'brand': record.get('brand'),
-                'year': record.get('year'),
-                'primary_image': record.get('primary_image'),
-                'url': f"/record/{record['id']}/"
-            })
-        
-        self.write_file('static/search-index.json', json.dumps(search_data, indent=2))
-        print(f"✓ Generated search index with {len(search_data)} records")
+        meta.json      - tiny header the client reads first (the one file
+                         that is not content-addressed), naming the
+                         <hash>/ directory that holds the rest
+        shards/XX.json - sorted terms starting with prefix XX and, for each,
+                         the ordinals of the records containing it (as gaps)
+                         with a parallel list of precomputed bm25 scores
+        docs/N.json    - display data ([id, name, game, image]) for ordinals
+                         N*chunk .. N*chunk+chunk-1
+        """
+        postings, source = self.search_postings(conn)
+        docs = [
+            [record.id, record.name, record.game,
+             record.primary_image_variants['thumb']['src'] if record.primary_image_variants
+             else record.primary_image]
+            for record in self.records
+        ]
+        
+        files = {}  # Path within the index directory -> JSON
+        shards = {}
+        for term in sorted(postings):
+            shards.setdefault(term[:SEARCH_PREFIX_LENGTH], []).append(term)
+        for prefix, terms in shards.items():
+            shard = {'terms': terms, 'postings': [], 'scores': []}
+            for term in terms:
+                ordinals = sorted(postings[term])
+                shard['postings'].append(delta_encode(ordinals))
+                shard['scores'].append([round_score(postings[term][n]) for n in ordinals])
+            files[f"shards/{shard_name(prefix)}.json"] = compact_json(shard)
+        
+        for start in range(0, len(docs), SEARCH_DOC_CHUNK):
+            chunk = docs[start:start + SEARCH_DOC_CHUNK]
+            files[f"docs/{start // SEARCH_DOC_CHUNK}.json"] = compact_json(chunk)
+        
+        # Any change to the index moves it to a new directory
+        h = hashlib.sha256()
+        for path in sorted(files):
+            h.update(path.encode('utf-8'))
+            h.update(files[path].encode('utf-8'))
+        index_dir = f"static/search/{h.hexdigest()[:ASSET_HASH_LENGTH]}/"
+        files = {index_dir + path: content for path, content in files.items()}
+        
+        header = {
+            'count': len(docs),
+            'prefix': SEARCH_PREFIX_LENGTH,
+            'min': SEARCH_MIN_TOKEN,
+            'chunk': SEARCH_DOC_CHUNK,
+            'base': index_dir[len('static/search/'):],
+        }
+        files['static/search/meta.json'] = compact_json(header)
+        print(f"✓ Generated search index from {source}: {len(postings)} terms "
+              f"in {len(shards)} shards, {len(docs)} records")
+        return index_dir, files
     
     def build(self):
         """Build entire static site"""
@@ -402,22 +1688,61 @@ class MuseumSiteGenerator:
             return False
         
         try:
-            conn = self.get_db_connection()
+            conn = self.get_db_connection(read_only=True)
+            missing = self.missing_indexes(conn)
+            if missing:
+                print(f"⚠ Database lacks indexes {', '.join(missing)}; "
+                      f"re-run scripts/migrate.py for faster builds")
             
             # Clean and setup
-            self.clean_output()
-            self.copy_static_files()
+            with self.stage('setup'):
+                self.clean_output()
+                self.copy_static_files()
+            
+            with self.stage('images'):
+                self.process_images(conn)
+            with self.stage('preload'):
+                self.preload(conn)
+            print(f"✓ Preloaded {len(self.records)} records, {len(self.steward_info)} stewards")
             
             # Generate all pages
-            self.generate_homepage(conn)
-            self.generate_browse_pages(conn)
-            self.generate_record_pages(conn)
-            self.generate_steward_pages(conn)
-            self.generate_about_page()
-            self.generate_search_json(conn)
+            with self.stage('homepage'):
+                self.generate_homepage(conn)
+            with self.stage('browse'):
+                self.generate_browse_pages(conn)
+            with self.stage('records'):
+                self.generate_record_pages(conn)
+            with self.stage('stewards'):
+                self.generate_steward_pages(conn)
+            self.close_worker_pool()
+            with self.stage('about'):
+                self.generate_about_page()
+            with self.stage('search'):
+                self.generate_search_index(conn)
             
+            slow_queries = self.check_query_plans(conn) if self.check_plans else []
             conn.close()
             
+            # Record what we built and drop everything else (deleted records...)
+            with self.stage('finalize'):
+                self.save_manifest()
+                self.save_asset_manifest()
+                self.generate_service_worker()
+            if self.compress:
+                with self.stage('compress'):
+                    self.compress_output()
+            with self.stage('prune'):
+                self.prune_output()
+            if self.incremental:
+                print(f"✓ Rendered {self.pages_rendered} pages, {self.pages_skipped} unchanged")
+            print(f"✓ Wrote {self.files_written} files, {self.files_unchanged} already up to date")
+            if self.profiler:
+                print()
+                self.profiler.print_summary(self.profile_report())
+            if slow_queries:
+                print(f"\n❌ Query plan check failed: {len(slow_queries)} slow queries")
+                return False
+            
             print("\n" + "="*60)
             print("✅ BUILD COMPLETE!")
             print("="*60)
@@ -435,8 +1760,84 @@ class MuseumSiteGenerator:
             import traceback
             traceback.print_exc()
             return False
+        finally:
+            self.close_worker_pool()
+    
+    def profile_report(self):
+        """JSON-ready profile of the last build (requires profile=True)"""
+        return self.profiler.report(self.pages_rendered, self.pages_skipped)
+
+# Per-process state for parallel builds (see MuseumSiteGenerator.render_pages)
+_worker = None
+_worker_conn = None
+
+def _init_worker(settings, manifest, images, assets, browse_index_dir):
+    """Give each worker process its own generator, Jinja env and read-only connection"""
+    global _worker, _worker_conn
+    _worker = MuseumSiteGenerator(**settings)
+    _worker.manifest = manifest
+    _worker.images = images
+    _worker.assets = assets
+    _worker.browse_index_dir = browse_index_dir
+    _worker_conn = _worker.get_db_connection(read_only=True)
+    _worker.preload(_worker_conn)
+    if _worker.profiler:
+        _worker.profiler.drain()  # Preload is not part of any chunk
+
+def _render_chunk(kind, keys):
+    """Render a batch of pages in a worker; returns its manifest entries and counters"""
+    _worker.new_manifest = {}
+    _worker.pages_rendered = _worker.pages_skipped = 0
+    _worker.files_written = _worker.files_unchanged = 0
+    _worker.render_pages(_worker_conn, kind, keys)
+    return {
+        'pages': _worker.new_manifest,
+        'rendered': _worker.pages_rendered,
+        'skipped': _worker.pages_skipped,
+        'written': _worker.files_written,
+        'unchanged': _worker.files_unchanged,
+        'profile': _worker.profiler.drain() if _worker.profiler else None,
+    }
 
 if __name__ == '__main__':
-    generator = MuseumSiteGenerator()
-    success = generator.build()
+    parser = argparse.ArgumentParser(description='Build the Esports Museum static site')
+    parser.add_argument('--db', default='museum.db', help='SQLite database path')
+    parser.add_argument('--output', default='output', help='Output directory')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep output/ and only re-render pages whose inputs changed')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Render record/steward/browse pages across N worker processes')
+    parser.add_argument('--page-size', type=int, default=48,
+                        help='Records per browse page')
+    parser.add_argument('--minify', action='store_true',
+                        help='Minify CSS, JS and HTML and inline critical CSS on the home/browse pages')
+    parser.add_argument('--compress', action='store_true',
+                        help='Also write precompressed .gz/.br copies of HTML, CSS, JS and JSON')
+    parser.add_argument('--profile-report', metavar='FILE',
+                        help='Write per-stage timings, SQL/template stats and peak RSS as JSON')
+    parser.add_argument('--check-query-plans', action='store_true',
+                        help='EXPLAIN every query the build ran; fail if one scans and sorts a whole table')
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help='Dump cProfile stats of the main process (view with pstats/snakeviz)')
+    parser.add_argument('--sw-cache-size', type=int, default=200,
+                        help='Pages (and data files) the service worker keeps beyond its precache')
+    args = parser.parse_args()
+    
+    generator = MuseumSiteGenerator(args.db, args.output, incremental=args.incremental,
+                                    jobs=args.jobs, page_size=args.page_size,
+                                    profile=bool(args.profile_report), compress=args.compress,
+                                    minify=args.minify, check_plans=args.check_query_plans,
+                                    sw_cache_size=args.sw_cache_size)
+    if args.cprofile:
+        profiler = cProfile.Profile()
+        success = profiler.runcall(generator.build)
+        profiler.dump_stats(args.cprofile)
+        print(f"✓ cProfile stats written to: {args.cprofile}")
+    else:
+        success = generator.build()
+    
+    if args.profile_report and success:
+        with open(args.profile_report, 'w', encoding='utf-8') as f:
+            json.dump(generator.profile_report(), f, indent=2)
+        print(f"✓ Profile report written to: {args.profile_report}")
     exit(0 if success else 1)
@@ -8,16 +8,206 @@ Fields: Name, Organization, Brand, Game, Item Type, Badges, Year, Steward,
 
 import sqlite3
 import json
+import re
+import hashlib
 from pathlib import Path
 
-def migrate_data(json_file='example-data.json', db_file='museum.db'):
+# Streaming imports: rows per executemany() batch, and JSON read size
+BATCH_SIZE = 5000
+READ_CHUNK = 1 << 20
+
+RECORD_INSERT = """
+    INSERT INTO records (
+        id, name, organization, brand, game, item_type,
+        badges, tags, year, steward, steward_link, rarity, 
+        availability, condition, chain_of_custody,
+        description, notes, verified, verification_date,
+        verification_notes, featured, featured_order, 
+        date_added, content_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Delta imports: insert new ids, rewrite changed ones in place (keeps rowid,
+# so the FTS update trigger applies) and stamp last_updated
+RECORD_UPSERT = RECORD_INSERT + """
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        organization = excluded.organization,
+        brand = excluded.brand,
+        game = excluded.game,
+        item_type = excluded.item_type,
+        badges = excluded.badges,
+        tags = excluded.tags,
+        year = excluded.year,
+        steward = excluded.steward,
+        steward_link = excluded.steward_link,
+        rarity = excluded.rarity,
+        availability = excluded.availability,
+        condition = excluded.condition,
+        chain_of_custody = excluded.chain_of_custody,
+        description = excluded.description,
+        notes = excluded.notes,
+        verified = excluded.verified,
+        verification_date = excluded.verification_date,
+        verification_notes = excluded.verification_notes,
+        featured = excluded.featured,
+        featured_order = excluded.featured_order,
+        date_added = excluded.date_added,
+        content_hash = excluded.content_hash,
+        last_updated = CURRENT_TIMESTAMP
+"""
+
+MEDIA_INSERT = """
+    INSERT INTO media (
+        record_id, type, url, caption, display_order, is_primary
+    ) VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+def record_row(item):
+    """Parameters for RECORD_INSERT from one JSON item (ValueError when the
+    item is not a JSON object)"""
+    if not isinstance(item, dict):
+        raise ValueError(f"expected a JSON object, got {type(item).__name__}")
+    # Convert lists to JSON strings
+    badges_json = json.dumps(item.get('badges', [])) if item.get('badges') else None
+    tags_json = json.dumps(item.get('tags', [])) if item.get('tags') else None
+    custody_json = json.dumps(item.get('chain_of_custody', [])) if item.get('chain_of_custody') else None
+    
+    return (
+        item.get('id'),
+        item.get('name'),
+        item.get('organization'),
+        item.get('brand'),
+        item.get('game'),
+        item.get('item_type'),
+        badges_json,
+        tags_json,
+        item.get('year'),
+        item.get('steward'),
+        item.get('steward_link'),
+        item.get('rarity'),
+        item.get('availability'),
+        item.get('condition'),
+        custody_json,
+        item.get('description'),
+        item.get('notes'),
+        1 if item.get('verified') else 0,
+        item.get('verification_date'),
+        item.get('verification_notes'),
+        1 if item.get('featured') else 0,
+        item.get('featured_order'),
+        item.get('date_added'),
+        item_hash(item)
+    )
+
+def item_label(item, number):
+    """How an item is named in error messages: its id, else its position"""
+    record_id = item.get('id') if isinstance(item, dict) else None
+    return record_id or f"UNKNOWN (item {number})"
+
+def item_hash(item):
+    """Content hash of a JSON item (record fields and media together)"""
+    canonical = json.dumps(item, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def media_rows(item):
+    """Parameters for MEDIA_INSERT, one per media entry of a JSON item
+    (ValueError when an entry is not a JSON object)"""
+    media_list = item.get('media') or []
+    if not isinstance(media_list, list) or not all(isinstance(m, dict) for m in media_list):
+        raise ValueError("media must be a list of JSON objects")
+    return [
+        (
+            item.get('id'),
+            media.get('type', 'image'),
+            media.get('url'),
+            media.get('caption'),
+            idx,
+            1 if media.get('is_primary', idx == 0) else 0
+        )
+        for idx, media in enumerate(media_list)
+    ]
+
+_WHITESPACE = re.compile(r'\s*')
+
+def iter_json_array(f):
+    """
+    Yield the items of a top-level JSON array one at a time, reading the
+    file in READ_CHUNK pieces so memory does not grow with the input
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    started = False
+    after_item = False  # an item was just read: ',' or ']' must follow
+    
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos >= len(buffer):
+            if eof:
+                raise json.JSONDecodeError("Unterminated array", buffer, pos)
+            chunk = f.read(READ_CHUNK)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        
+        char = buffer[pos]
+        if not started:
+            if char != '[':
+                raise json.JSONDecodeError("Expected a JSON array", buffer, pos)
+            started = True
+            pos += 1
+        elif char == ']':
+            return
+        elif char == ',' and after_item:
+            after_item = False
+            pos += 1
+        elif after_item:
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Item runs past the end of the buffer: read more and retry
+                chunk = f.read(READ_CHUNK)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield item
+            pos = end
+            after_item = True
+
+def iter_items(json_file):
+    """
+    Yield records from a JSON array file or a JSON Lines file (.jsonl /
+    .ndjson: one object per line)
+    """
+    with open(json_file, 'r', encoding='utf-8') as f:
+        if Path(json_file).suffix in ('.jsonl', '.ndjson'):
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise json.JSONDecodeError(f"line {line_number}: {e.msg}", e.doc, e.pos)
+        else:
+            yield from iter_json_array(f)
+
+def migrate_data(json_file='example-data.json', db_file='museum.db', stream=False):
     """
     Migrate JSON data to SQLite database
+    
+    With stream=True the input is parsed incrementally (JSON array or JSON
+    Lines) and inserted in batches; see migrate_stream().
     """
     print("Starting data migration...")
     print(f"Source: {json_file}")
     print(f"Target: {db_file}\n")
     
+    if stream:
+        return migrate_stream(json_file, db_file)
+    
     # Load JSON data
     try:
         with open(json_file, 'r') as f:
@@ -35,13 +225,7 @@ def migrate_data(json_file='example-data.json', db_file='museum.db'):
     cursor = conn.cursor()
     
     # Initialize schema
-    print("Initializing database schema...")
-    try:
-        with open('schema.sql', 'r') as f:
-            cursor.executescript(f.read())
-        print("✓ Database schema created")
-    except FileNotFoundError:
-        print("❌ Error: schema.sql not found")
+    if not init_schema(cursor):
         return False
     
     # Migrate records
@@ -51,48 +235,10 @@ def migrate_data(json_file='example-data.json', db_file='museum.db'):
     stewards = set()
     errors = []
     
-    for item in data:
+    for number, item in enumerate(data, 1):
         try:
-            # Convert lists to JSON strings
-            badges_json = json.dumps(item.get('badges', [])) if item.get('badges') else None
-            tags_json = json.dumps(item.get('tags', [])) if item.get('tags') else None
-            custody_json = json.dumps(item.get('chain_of_custody', [])) if item.get('chain_of_custody') else None
-            
             # Insert record with new field structure
-            cursor.execute("""
-                INSERT INTO records (
-                    id, name, organization, brand, game, item_type,
-                    badges, tags, year, steward, steward_link, rarity, 
-                    availability, condition, chain_of_custody,
-                    description, notes, verified, verification_date,
-                    verification_notes, featured, featured_order, 
-                    date_added
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                item.get('id'),
-                item.get('name'),
-                item.get('organization'),
-                item.get('brand'),
-                item.get('game'),
-                item.get('item_type'),
-                badges_json,
-                tags_json,
-                item.get('year'),
-                item.get('steward'),
-                item.get('steward_link'),
-                item.get('rarity'),
-                item.get('availability'),
-                item.get('condition'),
-                custody_json,
-                item.get('description'),
-                item.get('notes'),
-                1 if item.get('verified') else 0,
-                item.get('verification_date'),
-                item.get('verification_notes'),
-                1 if item.get('featured') else 0,
-                item.get('featured_order'),
-                item.get('date_added')
-            ))
+            cursor.execute(RECORD_INSERT, record_row(item))
             records_added += 1
             print(f"  ✓ {item.get('id')}: {item.get('name')}")
             
@@ -100,24 +246,12 @@ def migrate_data(json_file='example-data.json', db_file='museum.db'):
             stewards.add(item.get('steward'))
             
             # Insert media
-            if 'media' in item and item['media']:
-                for idx, media in enumerate(item['media']):
-                    cursor.execute("""
-                        INSERT INTO media (
-                            record_id, type, url, caption, display_order, is_primary
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                    """, (
-                        item.get('id'),
-                        media.get('type', 'image'),
-                        media.get('url'),
-                        media.get('caption'),
-                        idx,
-                        1 if media.get('is_primary', idx == 0) else 0
-                    ))
-                    media_added += 1
+            for row in media_rows(item):
+                cursor.execute(MEDIA_INSERT, row)
+                media_added += 1
             
         except Exception as e:
-            error_msg = f"Error migrating record {item.get('id', 'UNKNOWN')}: {e}"
+            error_msg = f"Error migrating record {item_label(item, number)}: {e}"
             errors.append(error_msg)
             print(f"  ❌ {error_msg}")
             continue
@@ -133,9 +267,266 @@ def migrate_data(json_file='example-data.json', db_file='museum.db'):
     
     # Commit changes
     conn.commit()
+    analyze(conn)
     conn.close()
     
-    # Print summary
+    print_summary(db_file, records_added, media_added, stewards, errors)
+    return len(errors) == 0
+
+def init_schema(cursor):
+    """Create tables, indexes and triggers from schema.sql, upgrading
+    databases created by older versions of it"""
+    print("Initializing database schema...")
+    try:
+        with open('schema.sql', 'r') as f:
+            schema = f.read()
+    except FileNotFoundError:
+        print("❌ Error: schema.sql not found")
+        return False
+    
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(records)")]
+    upgrading = bool(columns) and 'content_hash' not in columns
+    if upgrading:
+        # Older databases: no content_hash, and FTS update/delete triggers
+        # that left stale tokens behind in records_fts
+        cursor.execute("ALTER TABLE records ADD COLUMN content_hash TEXT")
+        cursor.execute("DROP TRIGGER IF EXISTS records_ad")
+        cursor.execute("DROP TRIGGER IF EXISTS records_au")
+    
+    cursor.executescript(schema)
+    if upgrading:
+        cursor.execute("INSERT INTO records_fts(records_fts) VALUES ('rebuild')")
+        cursor.connection.commit()
+        print("✓ Database schema upgraded (content_hash, FTS triggers)")
+    else:
+        print("✓ Database schema created")
+    return True
+
+def analyze(conn):
+    """Refresh the query planner statistics (sqlite_stat1) so build.py's
+    queries pick the right indexes for the data as it now is"""
+    conn.execute("ANALYZE")
+    conn.commit()
+    print("✓ Query planner statistics updated")
+
+def migrate_delta(json_file, db_file, changes_file=None):
+    """
+    Apply a full export as a delta against an existing database
+    
+    Items are matched to rows by id and compared by content hash: new and
+    changed items are upserted (with their media replaced), unchanged ones
+    are left alone, and rows missing from the input are deleted. The ids
+    touched are printed and, with changes_file, written out as JSON.
+    """
+    print("Starting delta migration...")
+    print(f"Source: {json_file}")
+    print(f"Target: {db_file}\n")
+    
+    if not Path(json_file).exists():
+        print(f"❌ Error: {json_file} not found")
+        return False
+    
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    if not init_schema(cursor):
+        return False
+    
+    existing = dict(cursor.execute("SELECT id, content_hash FROM records"))
+    print(f"✓ {len(existing)} records in database")
+    
+    changes = {'added': [], 'updated': [], 'removed': []}
+    seen = set()
+    stewards = set()
+    errors = []
+    unreadable = []  # Items that are not records: their ids are unknown
+    unchanged = 0
+    batch = []
+    
+    def flush():
+        # One transaction per batch; outside one, RELEASE would commit each item
+        with conn:
+            cursor.execute("BEGIN")
+            for record, media in batch:
+                record_id = record[0]
+                try:
+                    cursor.execute("SAVEPOINT item")
+                    cursor.execute(RECORD_UPSERT, record)
+                    cursor.execute("DELETE FROM media WHERE record_id = ?", (record_id,))
+                    cursor.executemany(MEDIA_INSERT, media)
+                    cursor.execute("RELEASE item")
+                    changes['updated' if record_id in existing else 'added'].append(record_id)
+                except sqlite3.Error as e:
+                    cursor.execute("ROLLBACK TO item")
+                    cursor.execute("RELEASE item")
+                    errors.append(f"Error migrating record {record_id or 'UNKNOWN'}: {e}")
+        batch.clear()
+    
+    print("\nComparing records...")
+    try:
+        for number, item in enumerate(iter_items(json_file), 1):
+            try:
+                record = record_row(item)
+                media = media_rows(item)
+            except ValueError as e:
+                unreadable.append(f"Error migrating record {item_label(item, number)}: {e}")
+                continue
+            seen.add(record[0])
+            if existing.get(record[0]) == record[-1]:
+                unchanged += 1
+                continue
+            batch.append((record, media))
+            stewards.add(item.get('steward'))
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    except json.JSONDecodeError as e:
+        # A truncated export must not be read as "everything else was deleted"
+        conn.close()
+        print(f"❌ Error: Invalid JSON - {e}")
+        return False
+    
+    # An unreadable item may be any existing record: delete nothing then
+    removed = [] if unreadable else sorted(set(existing) - seen)
+    errors = unreadable + errors
+    with conn:
+        for start in range(0, len(removed), BATCH_SIZE):
+            ids = [(record_id,) for record_id in removed[start:start + BATCH_SIZE]]
+            cursor.executemany("DELETE FROM media WHERE record_id = ?", ids)
+            cursor.executemany("DELETE FROM records WHERE id = ?", ids)
+        cursor.executemany("""
+            INSERT OR IGNORE INTO stewards (username)
+            VALUES (?)
+        """, [(steward,) for steward in stewards])
+    changes['removed'] = removed
+    analyze(conn)
+    conn.close()
+    
+    print("\n" + "="*60)
+    print("DELTA MIGRATION COMPLETE!")
+    print("="*60)
+    print(f"✓ Unchanged: {unchanged}")
+    for kind in ('added', 'updated', 'removed'):
+        ids = changes[kind]
+        preview = ', '.join(ids[:10]) + (f", ... (+{len(ids) - 10})" if len(ids) > 10 else '')
+        print(f"✓ {kind.title()}: {len(ids)}" + (f" - {preview}" if ids else ''))
+    
+    if unreadable:
+        print(f"\n⚠  {len(unreadable)} items could not be read; no records were removed")
+    if errors:
+        print(f"\n⚠  Errors encountered: {len(errors)}")
+        for error in errors[:100]:
+            print(f"  - {error}")
+    
+    if changes_file:
+        with open(changes_file, 'w', encoding='utf-8') as f:
+            json.dump(changes, f, indent=2)
+        print(f"\n✓ Changed ids written to: {changes_file}")
+    print("\nNext step: python scripts/build.py --incremental (re-renders only affected pages)")
+    print()
+    
+    return len(errors) == 0
+
+def migrate_stream(json_file, db_file):
+    """
+    Bulk import for very large dumps
+    
+    Items are parsed one at a time and inserted with executemany() in
+    BATCH_SIZE-row transactions, so memory stays bounded by the batch size.
+    The per-row FTS insert trigger is dropped for the load and records_fts is
+    rebuilt once at the end.
+    """
+    if not Path(json_file).exists():
+        print(f"❌ Error: {json_file} not found")
+        return False
+    
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    if not init_schema(cursor):
+        return False
+    
+    # Bulk-load settings (this connection only)
+    cursor.execute("PRAGMA journal_mode = MEMORY")
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute("PRAGMA cache_size = -262144")  # 256 MB
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    cursor.execute("DROP TRIGGER IF EXISTS records_ai")
+    
+    print("\nStreaming records...")
+    records_added = 0
+    media_added = 0
+    stewards = set()
+    errors = []
+    batch = []
+    
+    def flush():
+        nonlocal records_added, media_added
+        try:
+            with conn:
+                cursor.executemany(RECORD_INSERT, [record for record, _ in batch])
+                cursor.executemany(MEDIA_INSERT, [m for _, media in batch for m in media])
+            records_added += len(batch)
+            media_added += sum(len(media) for _, media in batch)
+        except sqlite3.Error:
+            # Something in the batch is bad: redo it row by row (still in one
+            # transaction) to find out what
+            with conn:
+                cursor.execute("BEGIN")
+                for record, media in batch:
+                    try:
+                        cursor.execute("SAVEPOINT item")
+                        cursor.execute(RECORD_INSERT, record)
+                        cursor.executemany(MEDIA_INSERT, media)
+                        cursor.execute("RELEASE item")
+                        records_added += 1
+                        media_added += len(media)
+                    except sqlite3.Error as e:
+                        cursor.execute("ROLLBACK TO item")
+                        cursor.execute("RELEASE item")
+                        errors.append(f"Error migrating record {record[0] or 'UNKNOWN'}: {e}")
+        batch.clear()
+        print(f"  ✓ {records_added:,} records, {media_added:,} media items")
+    
+    try:
+        for number, item in enumerate(iter_items(json_file), 1):
+            try:
+                batch.append((record_row(item), media_rows(item)))
+            except ValueError as e:
+                errors.append(f"Error migrating record {item_label(item, number)}: {e}")
+                continue
+            stewards.add(item.get('steward'))
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    except json.JSONDecodeError as e:
+        errors.append(f"Invalid JSON - {e}")
+        print(f"❌ Error: Invalid JSON - {e}")
+    finally:
+        # Index everything in one pass, then put the trigger back - whatever
+        # stopped the load, later imports rely on the trigger
+        print("\nRebuilding full-text search index...")
+        with conn:
+            cursor.execute("INSERT INTO records_fts(records_fts) VALUES ('rebuild')")
+        with open('schema.sql', 'r') as f:
+            cursor.executescript(f.read())
+        print("✓ Search index rebuilt")
+    
+    print("\nCreating steward entries...")
+    with conn:
+        cursor.executemany("""
+            INSERT OR IGNORE INTO stewards (username)
+            VALUES (?)
+        """, [(steward,) for steward in stewards])
+    print(f"✓ {len(stewards)} stewards registered")
+    analyze(conn)
+    conn.close()
+    
+    print_summary(db_file, records_added, media_added, stewards, errors)
+    return len(errors) == 0
+
+def print_summary(db_file, records_added, media_added, stewards, errors):
+    """Print the end-of-migration report"""
     print("\n" + "="*60)
     print("MIGRATION COMPLETE!")
     print("="*60)
@@ -145,16 +536,16 @@ def migrate_data(json_file='example-data.json', db_file='museum.db'):
     
     if errors:
         print(f"\n⚠  Errors encountered: {len(errors)}")
-        for error in errors:
+        for error in errors[:100]:
             print(f"  - {error}")
+        if len(errors) > 100:
+            print(f"  ... and {len(errors) - 100} more")
     
     print(f"\n✓ Database saved to: {db_file}")
     print("\nNext steps:")
     print("1. Test the build: python scripts/build.py")
     print("2. Push to GitHub: git add museum.db && git commit && git push")
     print()
-    
-    return len(errors) == 0
 
 def verify_migration(db_file='museum.db'):
     """
@@ -227,17 +618,28 @@ def verify_migration(db_file='museum.db'):
 if __name__ == '__main__':
     import sys
     
-    json_file = sys.argv[1] if len(sys.argv) > 1 else 'example-data.json'
-    db_file = sys.argv[2] if len(sys.argv) > 2 else 'museum.db'
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    json_file = args[0] if len(args) > 0 else 'example-data.json'
+    db_file = args[1] if len(args) > 1 else 'museum.db'
+    
+    # Incremental parsing + batched inserts for big dumps (always for JSON Lines)
+    stream = '--stream' in sys.argv or Path(json_file).suffix in ('.jsonl', '.ndjson')
+    
+    # Upsert changed items into an existing database (--changes=FILE to save the ids)
+    delta = '--delta' in sys.argv and Path(db_file).exists()
+    changes_file = next((arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--changes=')), None)
     
     # Remove existing database if requested
-    if '--fresh' in sys.argv or not Path(db_file).exists():
+    if not delta and ('--fresh' in sys.argv or not Path(db_file).exists()):
         if Path(db_file).exists():
             print(f"Removing existing database: {db_file}\n")
             Path(db_file).unlink()
     
     # Run migration
-    success = migrate_data(json_file, db_file)
+    if delta:
+        success = migrate_delta(json_file, db_file, changes_file)
+    else:
+        success = migrate_data(json_file, db_file, stream=stream)
     
     if success:
         verify_migration(db_file)
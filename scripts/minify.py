@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Minifiers for Esports Museum build output
+Pure-Python, conservative CSS/JS/HTML minification and critical-CSS extraction
+(used by build.py --minify)
+"""
+
+import re
+
+# CSS: comments are removed first (matching strings too, so a "/*" inside
+# one survives), then whitespace is squeezed outside strings
+CSS_COMMENT_OR_STRING = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', re.S)
+CSS_STRING = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+CSS_SPACE_AROUND = re.compile(r'\s*([{};,>])\s*')
+CSS_SPACE_AFTER_COLON = re.compile(r':\s+')
+
+def minify_css(css):
+    """Drop comments, collapse whitespace and remove it around { } ; , >"""
+    css = CSS_COMMENT_OR_STRING.sub(lambda m: ' ' if m.group().startswith('/*') else m.group(), css)
+    out = []
+    pos = 0
+    for match in CSS_STRING.finditer(css):
+        out.append(_minify_css_code(css[pos:match.start()]))
+        out.append(match.group())
+        pos = match.end()
+    out.append(_minify_css_code(css[pos:]))
+    return ''.join(out).strip()
+
+def _minify_css_code(code):
+    code = re.sub(r'\s+', ' ', code)
+    code = CSS_SPACE_AROUND.sub(r'\1', code)
+    code = CSS_SPACE_AFTER_COLON.sub(':', code)
+    return code.replace(';}', '}')
+
+# JS: a regex literal can follow these characters and keywords; anywhere
+# else "/" is division
+JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+JS_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                     'throw', 'case', 'do', 'else', 'yield', 'await'}
+# Spaces next to these can go (+ - / are excluded: "a + +b", "a / /re/")
+JS_PUNCTUATION = set('{}()[];,:=<>?!&|*%^~')
+JS_QUOTES = set('\'"`')
+
+def minify_js(source):
+    """Strip comments and indentation and drop blank lines, keeping line
+    breaks (so automatic semicolon insertion is unaffected). String,
+    template and regex literals are copied verbatim."""
+    pieces = []      # (is_code, text)
+    code = []
+    templates = []   # Open `${` expressions inside template literals: brace depth
+    i, n = 0, len(source)
+
+    def flush():
+        if code:
+            pieces.append((True, ''.join(code)))
+            code.clear()
+
+    while i < n:
+        c = source[i]
+        if c in '"\'':
+            j = i + 1
+            while j < n and source[j] != c and source[j] != '\n':
+                j += 2 if source[j] == '\\' else 1
+            flush()
+            pieces.append((False, source[i:j + 1]))
+            i = j + 1
+            continue
+        if c == '`' or (c == '}' and templates and templates[-1] == 0):
+            # Template literal text, from its start or from the end of a ${...}
+            if c == '}':
+                templates.pop()
+            j = i + 1
+            while j < n:
+                if source[j] == '\\':
+                    j += 2
+                elif source[j] == '`':
+                    j += 1
+                    break
+                elif source.startswith('${', j):
+                    j += 2
+                    templates.append(0)
+                    break
+                else:
+                    j += 1
+            flush()
+            pieces.append((False, source[i:j]))
+            i = j
+            continue
+        if c == '/' and source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if c == '/' and source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            code.append('\n' if '\n' in source[i:end] else ' ')
+            i = end
+            continue
+        if c == '/' and _regex_allowed(pieces, code):
+            j, in_class = i + 1, False
+            while j < n and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 2
+                    continue
+                if source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                elif source[j] == '/' and not in_class:
+                    break
+                j += 1
+            if j < n and source[j] == '/':
+                j += 1
+                while j < n and source[j].isalpha():
+                    j += 1
+                flush()
+                pieces.append((False, source[i:j]))
+                i = j
+                continue
+        if templates and c in '{}':
+            templates[-1] += 1 if c == '{' else -1
+        code.append(c)
+        i += 1
+    flush()
+
+    out = []
+    for k, (is_code, text) in enumerate(pieces):
+        if is_code:
+            # Neighbouring literals decide whether edge whitespace can go
+            before = pieces[k - 1][1][-1] if k > 0 else '\n'
+            after = pieces[k + 1][1][0] if k + 1 < len(pieces) else '\n'
+            text = _minify_js_code(text, before, after)
+        out.append(text)
+    return ''.join(out).strip()
+
+def _regex_allowed(pieces, code):
+    """Whether a "/" here starts a regex literal (vs. division)"""
+    text = ''.join(code).rstrip()
+    if not text:
+        # Right after a string/regex literal it is division; at the start of
+        # the script or of a template's ${ expression it is a regex
+        return not pieces or pieces[-1][1].endswith('${')
+    if text[-1] in JS_REGEX_AFTER:
+        return True
+    word = re.search(r'[\w$]+$', text)
+    return bool(word) and word.group() in JS_REGEX_KEYWORDS
+
+def _minify_js_code(code, before, after):
+    """Squeeze whitespace in a run of code; before/after are the characters
+    of the neighbouring literals (or a newline at either end of the script)"""
+    # Whitespace runs become one newline (if they had one) or one space
+    code = re.sub(r'\s+', lambda m: '\n' if '\n' in m.group() else ' ', code)
+    out = []
+    for i, c in enumerate(code):
+        prev = code[i - 1] if i > 0 else before
+        nxt = code[i + 1] if i + 1 < len(code) else after
+        if c == ' ':
+            # Next to punctuation or a string/template quote a space is never needed
+            if prev in JS_PUNCTUATION or nxt in JS_PUNCTUATION or prev in JS_QUOTES or nxt in JS_QUOTES:
+                if not ('/' in (prev, nxt) and '*' in (prev, nxt)):
+                    continue
+        elif c == '\n' and prev in '{;,\n':
+            continue  # Never ends a statement after these
+        out.append(c)
+    return ''.join(out)
+
+# HTML: comments, raw-text elements and tags are tokens; everything between
+# them is text whose whitespace runs collapse to one space (or newline)
+HTML_TOKEN = re.compile(r'''
+    (?P<comment><!--.*?-->)
+  | (?P<raw><(?P<name>pre|textarea|script|style)\b(?:[^>"']|"[^"]*"|'[^']*')*>)(?P<body>.*?)(?P<end></(?P=name)\s*>)
+  | (?P<tag><(?:[^>"']|"[^"]*"|'[^']*')*>)
+''', re.S | re.I | re.X)
+HTML_TAG_SPACE = re.compile(r'("[^"]*"|\'[^\']*\')|\s+')
+
+def minify_html(html):
+    """Collapse whitespace in text and inside tags (outside attribute values),
+    drop comments, minify inline <script>/<style>; <pre> and <textarea>
+    content is kept exactly"""
+    out = []
+    pos = 0
+    for match in HTML_TOKEN.finditer(html):
+        out.append(_collapse_text(html[pos:match.start()]))
+        pos = match.end()
+        if match.group('comment'):
+            if match.group().startswith('<!--['):
+                out.append(match.group())  # Conditional comments
+            continue
+        if match.group('tag'):
+            out.append(_minify_tag(match.group('tag')))
+            continue
+        name = match.group('name').lower()
+        start, body = match.group('raw'), match.group('body')
+        if name == 'style':
+            body = minify_css(body)
+        elif name == 'script' and ' src=' not in start and _is_js(start):
+            body = minify_js(body)
+        out.append(_minify_tag(start) + body + match.group('end'))
+    out.append(_collapse_text(html[pos:]))
+    return ''.join(out).strip() + '\n'
+
+def _collapse_text(text):
+    return re.sub(r'\s+', lambda m: '\n' if '\n' in m.group() else ' ', text)
+
+def _minify_tag(tag):
+    tag = HTML_TAG_SPACE.sub(lambda m: m.group(1) or ' ', tag)
+    return tag.replace(' >', '>').replace(' />', '/>')
+
+def _is_js(start_tag):
+    kind = re.search(r'type=["\']?([^"\'\s>]+)', start_tag, re.I)
+    return not kind or kind.group(1).lower() in ('text/javascript', 'module', 'application/javascript')
+
+# Critical CSS: rules whose selectors only need classes, ids and elements that
+# occur in the above-the-fold HTML
+
+def parse_css(css):
+    """Minified CSS -> list of (prelude, body); body is a nested list for
+    grouping at-rules (@media, @supports), a declaration string otherwise"""
+    rules, stack = [], []
+    current, pos, start = rules, 0, 0
+    while pos < len(css):
+        c = css[pos]
+        if c in '"\'':
+            pos = css.index(c, pos + 1) + 1
+            continue
+        if c == '{':
+            prelude = css[start:pos].strip()
+            if prelude.startswith(('@media', '@supports')):
+                children = []
+                current.append((prelude, children))
+                stack.append(current)
+                current = children
+                start = pos + 1
+            else:
+                # Plain rule or an opaque at-rule (@font-face, @keyframes):
+                # find the matching close brace
+                depth, end = 1, pos + 1
+                while depth:
+                    if css[end] in '"\'':
+                        end = css.index(css[end], end + 1)
+                    elif css[end] == '{':
+                        depth += 1
+                    elif css[end] == '}':
+                        depth -= 1
+                    end += 1
+                current.append((prelude, css[pos + 1:end - 1]))
+                start = pos = end
+                continue
+        elif c == '}':
+            current = stack.pop() if stack else rules
+            start = pos + 1
+        elif c == ';' and not stack and css[start:pos].lstrip().startswith('@'):
+            current.append((css[start:pos + 1].strip(), None))  # @import, @charset
+            start = pos + 1
+        pos += 1
+    return rules
+
+def critical_css(rules, html):
+    """Serialize the subset of parse_css() rules that can apply to html"""
+    classes = set()
+    for value in re.findall(r'\sclass="([^"]*)"', html):
+        classes.update(value.split())
+    ids = set(re.findall(r'\sid="([^"]*)"', html))
+    tags = {tag.lower() for tag in re.findall(r'<([a-zA-Z][\w-]*)', html)}
+    
+    def selector_matches(selector):
+        selector = re.sub(r'\[[^\]]*\]', '', selector)  # Attributes
+        selector = re.sub(r'::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?', '', selector)  # Pseudo-classes
+        if not set(re.findall(r'\.([\w-]+)', selector)) <= classes:
+            return False
+        if not set(re.findall(r'#([\w-]+)', selector)) <= ids:
+            return False
+        elements = re.findall(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)', selector)
+        return {element.lower() for element in elements} <= tags
+    
+    keyframes = []
+    
+    def select(items):
+        kept = []
+        for prelude, body in items:
+            if isinstance(body, list):
+                children = select(body)
+                if children:
+                    kept.append(f"{prelude}{{{children}}}")
+            elif 'keyframes' in prelude:
+                keyframes.append((prelude, body))
+            elif prelude.startswith('@'):
+                kept.append(prelude if body is None else f"{prelude}{{{body}}}")
+            elif any(selector_matches(selector) for selector in _split_selectors(prelude)):
+                kept.append(f"{prelude}{{{body}}}")
+        return ''.join(kept)
+    
+    css = select(rules)
+    # Keyframes are only worth inlining if a critical rule animates with them
+    for prelude, body in keyframes:
+        if re.search(r'[:\s,]' + re.escape(prelude.split()[-1]) + r'\b', css):
+            css += f"{prelude}{{{body}}}"
+    return css
+
+def _split_selectors(prelude):
+    """Split a selector list on top-level commas"""
+    parts, depth, start = [], 0, 0
+    for i, c in enumerate(prelude):
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            parts.append(prelude[start:i])
+            start = i + 1
+    parts.append(prelude[start:])
+    return parts
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Development server for Esports Museum
+Renders pages on request straight from museum.db with build.py's
+MuseumSiteGenerator (same templates, URLs and contexts as a build), keeps
+recently rendered pages in an LRU cache and reloads the browser when the
+database, templates or static files change
+"""
+
+import re
+import time
+import argparse
+import threading
+import mimetypes
+import traceback
+from collections import OrderedDict
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, unquote
+
+from build import MuseumSiteGenerator, page_dir
+
+# Besides the database, changes to anything in these invalidate every page
+WATCH_DIRS = ('templates', 'static')
+POLL_INTERVAL = 0.5  # Seconds
+
+# Pages listen for changes on this server-sent events stream
+RELOAD_URL = '/__reload'
+RELOAD_SCRIPT = (f'<script>new EventSource("{RELOAD_URL}").onmessage = '
+                 f'function () {{ location.reload(); }};</script>')
+RELOAD_KEEPALIVE = 15  # Seconds between comments on an idle stream
+
+class MuseumDevServer:
+    """Page rendering, caching and change tracking behind the HTTP handler"""
+    
+    def __init__(self, db_path='museum.db', cache_size=256, page_size=48):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.page_size = page_size
+        self.static_dir = Path('static').resolve()
+        
+        self.cache = OrderedDict()    # Output path -> (content type, body), oldest first
+        self.lock = threading.Lock()  # Rendering is serialized: the generator is not thread-safe
+        self.generator = None         # Catalogue loaded on the first request after a change
+        self.conn = None
+        self.browse_routes = {}       # browse/.../index.html -> browse_page() key
+        self.browse_files = {}        # static/browse/... -> JSON (browse.js data)
+        self.search_files = None      # static/search/... -> JSON, built when first requested
+        
+        self.version = 0              # Bumped on every change; reload streams wait on it
+        self.changed = threading.Condition()
+        self.snapshot = self.scan()
+    
+    def scan(self):
+        """(mtime, size) of the database and of every watched file"""
+        paths = [Path(self.db_path)]
+        for directory in WATCH_DIRS:
+            paths.extend(path for path in Path(directory).rglob('*') if path.is_file())
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+    
+    def watch(self):
+        """Poll for changes. A change is acted on once it has settled (no
+        further change for one more poll), so a migration still writing the
+        database is not read half-done"""
+        changed = set()
+        while True:
+            time.sleep(POLL_INTERVAL)
+            snapshot = self.scan()
+            if snapshot != self.snapshot:
+                changed.update(path for path in snapshot.keys() | self.snapshot.keys()
+                               if snapshot.get(path) != self.snapshot.get(path))
+                self.snapshot = snapshot
+                continue
+            if changed:
+                names = sorted(changed)
+                print(f"↻ Changed: {', '.join(names[:3])}"
+                      + (f" (+{len(names) - 3} more)" if len(names) > 3 else ''))
+                changed.clear()
+                self.invalidate()
+    
+    def invalidate(self):
+        """Drop everything rendered or loaded and tell open pages to reload"""
+        with self.lock:
+            self.cache.clear()
+            if self.conn is not None:
+                self.conn.close()
+            self.generator = self.conn = self.search_files = None
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+    
+    def load(self):
+        """Generator with the catalogue preloaded, as for a build"""
+        if self.generator is None:
+            start = time.perf_counter()
+            generator = MuseumSiteGenerator(self.db_path, page_size=self.page_size)
+            # migrate.py may write while the server runs, so keep SQLite's locking
+            conn = generator.get_db_connection(read_only=True, immutable=False)
+            generator.preload(conn)
+            generator.browse_index_dir, self.browse_files = generator.browse_index_files()
+            _, pages = generator.browse_keys()
+            self.browse_routes = {
+                page_dir(generator.browse_dir(*key[:3]), key[3]) + 'index.html': key
+                for key in pages
+            }
+            self.generator, self.conn = generator, conn
+            print(f"✓ Loaded {len(generator.records)} records "
+                  f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return self.generator
+    
+    def page(self, path):
+        """(template, path, context) for a page's output path, None if there is no such page"""
+        generator, conn = self.load(), self.conn
+        if path == 'index.html':
+            return generator.home_page(conn)
+        if path == 'about/index.html':
+            return generator.about_page()
+        if path == 'browse/empty/index.html':
+            return generator.empty_browse_page()
+        if path in self.browse_routes:
+            return generator.browse_page(conn, self.browse_routes[path])
+        
+        match = re.fullmatch(r'(record|steward)/([^/]+)/index\.html', path)
+        if match and match.group(1) == 'record':
+            record_id = match.group(2)
+            record = next(generator.iter_records(conn, record_id, record_id), None)
+            return generator.record_page(record) if record else None
+        if match and match.group(2) in generator.records_by_steward:
+            return generator.steward_page(conn, match.group(2))
+        return None
+    
+    def get(self, path):
+        """(status, content type, body, how) for an output path; how is
+        'cached', 'rendered' or 'static'"""
+        if path.startswith('static/') and not path.startswith(('static/search/', 'static/browse/')):
+            file = (self.static_dir / path[len('static/'):]).resolve()
+            if file.is_relative_to(self.static_dir) and file.is_file():
+                content_type = mimetypes.guess_type(file.name)[0] or 'application/octet-stream'
+                return 200, content_type, file.read_bytes(), 'static'
+            return 404, 'text/plain', b'Not found', 'static'
+        
+        with self.lock:
+            if path in self.cache:
+                self.cache.move_to_end(path)
+                return (200, *self.cache[path], 'cached')
+            
+            if path.startswith(('static/search/', 'static/browse/')):
+                self.load()
+                if path.startswith('static/search/') and self.search_files is None:
+                    _, self.search_files = self.generator.search_index_files(self.conn)
+                content = (self.search_files or {}).get(path) or self.browse_files.get(path)
+                if content is None:
+                    return 404, 'text/plain', b'Not found', 'rendered'
+                response = ('application/json', content.encode('utf-8'))
+            else:
+                page = self.page(path)
+                if page is None:
+                    return 404, 'text/html; charset=utf-8', self.error_page('Not found'), 'rendered'
+                template_name, _, context = page
+                html = self.generator.jinja_env.get_template(template_name).render(**context)
+                html = html.replace('</body>', RELOAD_SCRIPT + '</body>', 1)
+                response = ('text/html; charset=utf-8', html.encode('utf-8'))
+            
+            self.cache[path] = response
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return (200, *response, 'rendered')
+    
+    def error_page(self, message):
+        """Plain page for errors; it reloads with the rest once the cause is fixed"""
+        return (f'<!DOCTYPE html><html><body><pre>{escape(message)}</pre>'
+                f'{RELOAD_SCRIPT}</body></html>').encode('utf-8')
+
+class MuseumRequestHandler(BaseHTTPRequestHandler):
+    """Maps the site's URL layout (/record/<id>/, /steward/<name>/,
+    /browse/<facets>/...) to MuseumDevServer.get()"""
+    
+    def do_GET(self):
+        museum = self.server.museum
+        url = unquote(urlsplit(self.path).path)
+        if url == RELOAD_URL:
+            return self.stream_reloads(museum)
+        
+        path = url.lstrip('/')
+        if path == '' or path.endswith('/'):
+            path += 'index.html'
+        elif '.' not in path.rsplit('/', 1)[-1]:
+            # Directory without its slash (as GitHub Pages does)
+            self.send_response(301)
+            self.send_header('Location', url + '/' + (f"?{urlsplit(self.path).query}"
+                                                      if urlsplit(self.path).query else ''))
+            self.end_headers()
+            return
+        
+        start = time.perf_counter()
+        try:
+            status, content_type, body, how = museum.get(path)
+        except Exception:
+            status, content_type, how = 500, 'text/html; charset=utf-8', 'failed'
+            body = museum.error_page(traceback.format_exc())
+            traceback.print_exc()
+        
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+        if how != 'static':
+            mark = '✓' if status == 200 else '⚠'
+            print(f"{mark} {status} {url} {how} in {(time.perf_counter() - start) * 1000:.1f}ms")
+    
+    def stream_reloads(self, museum):
+        """Server-sent events: one 'reload' message per change"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        version = museum.version
+        try:
+            while True:
+                with museum.changed:
+                    museum.changed.wait_for(lambda: museum.version != version, RELOAD_KEEPALIVE)
+                if museum.version != version:
+                    version = museum.version
+                    self.wfile.write(b'data: reload\n\n')
+                else:
+                    self.wfile.write(b': keepalive\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def log_message(self, format, *args):
+        pass  # do_GET prints its own line for pages
+
+def serve(db_path='museum.db', host='127.0.0.1', port=8000, cache_size=256, page_size=48):
+    """Run the development server until interrupted"""
+    if not Path(db_path).exists():
+        print(f"❌ Error: Database not found at {db_path}")
+        return False
+    
+    museum = MuseumDevServer(db_path, cache_size=cache_size, page_size=page_size)
+    museum.load()
+    threading.Thread(target=museum.watch, daemon=True).start()
+    
+    server = ThreadingHTTPServer((host, port), MuseumRequestHandler)
+    server.daemon_threads = True
+    server.museum = museum
+    print(f"✓ Serving {db_path} at http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")
+    finally:
+        server.server_close()
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Preview the Esports Museum site without building it')
+    parser.add_argument('--db', default='museum.db', help='SQLite database path')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help='Rendered pages kept in memory (least recently used are dropped)')
+    parser.add_argument('--page-size', type=int, default=48, help='Records per browse page')
+    args = parser.parse_args()
+    
+    exit(0 if serve(args.db, args.host, args.port, args.cache_size, args.page_size) else 1)
@@ -0,0 +1,316 @@
+// Esports Museum - Client-side browsing
+//
+// Filters the collection in the browser with the data scripts/build.py
+// writes to static/browse/<hash>/ (see browse_index_files()). facets.json
+// has one bitset per filter value over the records in browse order: a
+// selection is an OR of bitsets within each group and an AND across groups,
+// and a chip's count is that AND with its own bitset. cards/<n>.json hold
+// display data for the records on screen. The selection lives in the URL
+// hash (#type=jersey,hardware&rarity=rare&page=2), so filtered views can be
+// bookmarked; without a hash the page shows what it was prerendered with.
+
+(() => {
+    const page = document.getElementById('browsePage');
+    if (!page || !page.dataset.index || !window.fetch) return;
+
+    const indexUrl = page.dataset.index;
+    const basePath = page.dataset.base;
+    const pageSize = parseInt(page.dataset.pageSize, 10) || 48;
+    const filters = document.getElementById('browseFilters');
+    const results = document.getElementById('browseResults');
+    const total = document.getElementById('browseTotal');
+    const cardTemplate = document.getElementById('browseCard');
+    const chunks = new Map();
+
+    // Selection and page number the page was prerendered with
+    const defaults = activeChips();
+    const defaultPage = parseInt((location.pathname.match(/\/page\/(\d+)\/?$/) || [])[1], 10) || 1;
+    let data = null;
+    let renderSequence = 0;
+
+    function loadJson(path) {
+        return fetch(indexUrl + path).then(response => {
+            if (!response.ok) throw new Error(response.status + ' ' + path);
+            return response.json();
+        });
+    }
+
+    // Base64 bitset -> Uint32Array (little-endian words, see bitset() in build.py)
+    function decodeBits(encoded) {
+        const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+        const view = new DataView(bytes.buffer);
+        const words = new Uint32Array(bytes.length / 4);
+        for (let i = 0; i < words.length; i++) words[i] = view.getUint32(i * 4, true);
+        return words;
+    }
+
+    function popcount(x) {
+        x -= (x >>> 1) & 0x55555555;
+        x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+        return Math.imul((x + (x >>> 4)) & 0x0F0F0F0F, 0x01010101) >>> 24;
+    }
+
+    function countBits(words) {
+        let count = 0;
+        for (let i = 0; i < words.length; i++) count += popcount(words[i]);
+        return count;
+    }
+
+    // Selection: group key -> Set of value slugs (absent or empty: any)
+    function activeChips() {
+        const selection = new Map();
+        filters.querySelectorAll('.filter-group').forEach(group => {
+            const chosen = new Set();
+            group.querySelectorAll('.filter-chip.active').forEach(chip => {
+                if (chip.dataset.value) chosen.add(chip.dataset.value);
+            });
+            if (chosen.size) selection.set(group.dataset.group, chosen);
+        });
+        return selection;
+    }
+
+    function readHash() {
+        const hash = location.hash.slice(1);
+        if (!hash) return { selection: defaults, page: defaultPage };
+        const selection = new Map();
+        let pageNumber = 1;
+        for (const part of hash.split('&')) {
+            const [key, value] = part.split('=');
+            if (!value) continue;
+            if (key === 'page') pageNumber = Math.max(1, parseInt(value, 10) || 1);
+            else selection.set(key, new Set(value.split(',').map(decodeURIComponent)));
+        }
+        return { selection, page: pageNumber };
+    }
+
+    function writeHash(selection, pageNumber) {
+        const parts = [];
+        for (const [key, chosen] of selection) {
+            if (chosen.size) parts.push(key + '=' + Array.from(chosen).map(encodeURIComponent).join(','));
+        }
+        if (pageNumber > 1) parts.push('page=' + pageNumber);
+        // "#all" keeps an emptied selection from falling back to the page's own
+        location.hash = parts.length ? parts.join('&') : 'all';
+    }
+
+    // Records matching the selection in every group but `except` (null: all records)
+    function matching(selection, except) {
+        let result = null;
+        for (const group of data.groups) {
+            const chosen = selection.get(group.key);
+            if (group.key === except || !chosen || !chosen.size) continue;
+            const union = new Uint32Array(data.words);
+            for (const slug of chosen) {
+                const bits = group.bits[group.index.get(slug)];
+                if (!bits) continue;
+                for (let i = 0; i < union.length; i++) union[i] |= bits[i];
+            }
+            if (result === null) {
+                result = union;
+            } else {
+                for (let i = 0; i < result.length; i++) result[i] &= union[i];
+            }
+        }
+        return result;
+    }
+
+    function updateChips(selection) {
+        for (const group of data.groups) {
+            const element = filters.querySelector(`.filter-group[data-group="${group.key}"]`);
+            if (!element) continue;
+            const others = matching(selection, group.key);
+            const chosen = selection.get(group.key);
+            element.querySelectorAll('.filter-chip').forEach(chip => {
+                const slug = chip.dataset.value;
+                chip.classList.toggle('active', slug ? Boolean(chosen && chosen.has(slug)) : !(chosen && chosen.size));
+                if (!slug) return;
+                const bits = group.bits[group.index.get(slug)];
+                let count = 0;
+                if (bits && others) {
+                    for (let i = 0; i < bits.length; i++) count += popcount(bits[i] & others[i]);
+                } else if (bits) {
+                    count = countBits(bits);
+                }
+                chip.querySelector('.filter-count').textContent = count;
+                chip.classList.toggle('empty', count === 0 && !chip.classList.contains('active'));
+            });
+        }
+    }
+
+    // Browse positions of the matches on one page, and the total
+    function pageOfMatches(selection, pageNumber) {
+        const words = matching(selection, null);
+        const count = words ? countBits(words) : data.count;
+        const start = (pageNumber - 1) * pageSize;
+        const positions = [];
+        if (words) {
+            let seen = 0;
+            for (let i = 0; i < words.length && positions.length < pageSize; i++) {
+                let word = words[i];
+                const bits = popcount(word);
+                if (seen + bits <= start) {
+                    seen += bits;  // Whole word before this page
+                    continue;
+                }
+                while (word) {
+                    const low = word & -word;
+                    if (seen++ >= start) positions.push(i * 32 + 31 - Math.clz32(low));
+                    word ^= low;
+                    if (positions.length === pageSize) break;
+                }
+            }
+        } else {
+            for (let n = start; n < Math.min(start + pageSize, data.count); n++) positions.push(n);
+        }
+        return { positions, count };
+    }
+
+    function loadChunk(index) {
+        if (!chunks.has(index)) chunks.set(index, loadJson('cards/' + index + '.json'));
+        return chunks.get(index);
+    }
+
+    function isVerified(position) {
+        const group = data.groups.find(g => g.key === 'verified');
+        const bits = group && group.bits[0];
+        return Boolean(bits && (bits[position >>> 5] >>> (position & 31)) & 1);
+    }
+
+    function card(position, row) {
+        const [name, game, steward, image] = row;
+        const id = data.ids[position];
+        const recordUrl = basePath + 'record/' + id + '/';
+        const node = cardTemplate.content.firstElementChild.cloneNode(true);
+
+        const link = node.querySelector('.record-image');
+        link.href = recordUrl;
+        if (image) {
+            const img = document.createElement('img');
+            // Locally stored images are site-relative thumbnails (static/img/...)
+            img.src = /^([a-z]+:)?\/\//i.test(image) ? image : basePath + image;
+            img.alt = name;
+            img.loading = 'lazy';
+            img.decoding = 'async';
+            link.prepend(img);
+        } else {
+            const placeholder = document.createElement('div');
+            placeholder.className = 'placeholder-image';
+            link.prepend(placeholder);
+        }
+        if (!isVerified(position)) link.querySelector('.card-badge').remove();
+
+        node.querySelector('.record-id').textContent = id;
+        node.querySelector('.esport-tag').textContent = String(game).toUpperCase();
+        const title = node.querySelector('.record-title a');
+        title.href = recordUrl;
+        title.textContent = name;
+        const stewardLink = node.querySelector('.record-steward');
+        stewardLink.href = basePath + 'steward/' + steward + '/';
+        stewardLink.textContent = '@' + steward;
+        return node;
+    }
+
+    function pageLink(selection, pageNumber, label, enabled, rel) {
+        const link = document.createElement(enabled ? 'a' : 'span');
+        link.className = 'filter-chip' + (enabled ? '' : ' disabled');
+        link.textContent = label;
+        if (enabled) {
+            link.href = '#';
+            link.rel = rel;
+            link.addEventListener('click', (e) => {
+                e.preventDefault();
+                writeHash(selection, pageNumber);
+                page.scrollIntoView({ behavior: 'smooth', block: 'start' });
+            });
+        }
+        return link;
+    }
+
+    async function render(selection, pageNumber) {
+        const sequence = ++renderSequence;
+        const { positions, count } = pageOfMatches(selection, pageNumber);
+        const rows = await Promise.all(positions.map(async position => {
+            const chunk = await loadChunk(Math.floor(position / data.chunk));
+            return chunk[position % data.chunk];
+        }));
+        // A newer selection has started its own render
+        if (sequence !== renderSequence) return;
+
+        total.textContent = count + ' records found';
+        const content = document.createDocumentFragment();
+        if (positions.length) {
+            const grid = document.createElement('div');
+            grid.className = 'browse-grid';
+            positions.forEach((position, i) => grid.appendChild(card(position, rows[i])));
+            content.appendChild(grid);
+
+            const pages = Math.max(1, Math.ceil(count / pageSize));
+            if (pages > 1) {
+                const nav = document.createElement('nav');
+                nav.className = 'pagination';
+                const status = document.createElement('span');
+                status.className = 'pagination-status';
+                status.textContent = `Page ${pageNumber} of ${pages}`;
+                nav.append(
+                    pageLink(selection, pageNumber - 1, '← Previous', pageNumber > 1, 'prev'),
+                    status,
+                    pageLink(selection, pageNumber + 1, 'Next →', pageNumber < pages, 'next'));
+                content.appendChild(nav);
+            }
+        } else {
+            content.appendChild(noResults());
+        }
+        results.replaceChildren(content);
+    }
+
+    function noResults() {
+        const element = document.createElement('div');
+        element.className = 'no-results';
+        element.innerHTML = `
+            <div class="no-results-icon">◆</div>
+            <h2 class="no-results-title">No Records Found</h2>
+            <p class="no-results-desc">Try adjusting your filters to see more results</p>
+            <a href="#all" class="no-results-button">Clear All Filters</a>`;
+        return element;
+    }
+
+    function apply() {
+        const { selection, page: pageNumber } = readHash();
+        updateChips(selection);
+        // The prerendered grid already shows the page's own selection
+        if (location.hash || renderSequence) {
+            render(selection, pageNumber).catch(error => console.error('Browse error:', error));
+        }
+    }
+
+    filters.addEventListener('click', (e) => {
+        const chip = e.target.closest('.filter-chip');
+        if (!chip || !data) return;
+        e.preventDefault();
+
+        const { selection } = readHash();
+        const key = chip.closest('.filter-group').dataset.group;
+        const chosen = new Set(selection.get(key) || []);
+        if (!chip.dataset.value) {
+            chosen.clear();
+        } else if (chosen.has(chip.dataset.value)) {
+            chosen.delete(chip.dataset.value);
+        } else {
+            chosen.add(chip.dataset.value);
+        }
+        const next = new Map(selection);
+        next.set(key, chosen);
+        writeHash(next, 1);
+    });
+
+    loadJson('facets.json').then(facets => {
+        facets.words = Math.ceil(facets.count / 32);
+        for (const group of facets.groups) {
+            group.bits = group.bits.map(decodeBits);
+            group.index = new Map(group.values.map((slug, i) => [slug, i]));
+        }
+        data = facets;
+        window.addEventListener('hashchange', apply);
+        apply();
+    }).catch(error => console.error('Failed to load browse data:', error));
+})();
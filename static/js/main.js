@@ -11,25 +11,45 @@ if (mobileMenuBtn) {
     });
 }
 
-// Global Search
+// Global Search: runs in a worker (static/js/search-worker.js, URL in the
+// input's data-worker) so typing never waits on index loading or ranking.
+// Every keystroke is sent with a new sequence number; the worker drops
+// stale queries and streams back the newest one's top results, which are
+// painted once per frame into reused result nodes.
 const globalSearch = document.getElementById('globalSearch');
 const searchResults = document.getElementById('searchResults');
-let searchTimeout;
+let searchWorker = null;
+let searchSequence = 0;
+let pendingResults = null;  // Newest worker message not yet painted
+const resultNodes = [];
+let noResultsNode = null;
 
-if (globalSearch) {
+// Determine base path based on current location
+const getBasePath = () => {
+    const depth = (window.location.pathname.match(/\//g) || []).length - 1;
+    if (depth === 0) return '';
+    return '../'.repeat(depth);
+};
+
+if (globalSearch && globalSearch.dataset.worker && window.Worker) {
     globalSearch.addEventListener('input', (e) => {
         const query = e.target.value.trim();
-        
-        clearTimeout(searchTimeout);
+        const sequence = ++searchSequence;
         
         if (query.length < 2) {
             searchResults.classList.remove('active');
             return;
         }
         
-        searchTimeout = setTimeout(() => {
-            performSearch(query);
-        }, 300);
+        if (!searchWorker) {
+            searchWorker = new Worker(globalSearch.dataset.worker);
+            searchWorker.onmessage = receiveResults;
+        }
+        searchWorker.postMessage({
+            sequence,
+            query,
+            indexUrl: new URL(getBasePath() + 'static/search/', window.location.href).href
+        });
     });
     
     // Close search results when clicking outside
@@ -40,68 +60,207 @@ if (globalSearch) {
     });
 }
 
-// Load search index
-let searchIndex = [];
+function receiveResults(e) {
+    // Results of an older keystroke (or of a query since cleared)
+    if (e.data.sequence !== searchSequence) return;
+    if (!pendingResults) requestAnimationFrame(paintResults);
+    pendingResults = e.data;
+}
 
-// Determine base path based on current location
-const getBasePath = () => {
-    const depth = (window.location.pathname.match(/\//g) || []).length - 1;
-    if (depth === 0) return '';
-    return '../'.repeat(depth);
-};
+function paintResults() {
+    const message = pendingResults;
+    pendingResults = null;
+    if (!message || message.sequence !== searchSequence) return;
+    
+    const { results, done } = message;
+    if (results.length === 0 && !done) return;
+    
+    const basePath = getBasePath();
+    results.forEach((record, i) => updateResultNode(resultNode(i), record, basePath));
+    for (let i = results.length; i < resultNodes.length; i++) resultNodes[i].hidden = true;
+    
+    if (results.length === 0) {
+        if (!noResultsNode) {
+            noResultsNode = document.createElement('div');
+            noResultsNode.className = 'search-no-results';
+            noResultsNode.textContent = 'No results found';
+            searchResults.appendChild(noResultsNode);
+        }
+        noResultsNode.hidden = false;
+    } else if (noResultsNode) {
+        noResultsNode.hidden = true;
+    }
+    searchResults.classList.add('active');
+}
 
-fetch(getBasePath() + 'static/search-index.json')
-    .then(response => response.json())
-    .then(data => {
-        searchIndex = data;
-    })
-    .catch(error => console.error('Failed to load search index:', error));
+// The i-th result row, created once and reused for every later query
+function resultNode(i) {
+    while (resultNodes.length <= i) {
+        const item = document.createElement('a');
+        item.className = 'search-result-item';
+        item.innerHTML = `
+            <img width="60" height="60" loading="lazy" alt="">
+            <div class="search-result-placeholder"></div>
+            <div class="search-result-text">
+                <div class="search-result-title"></div>
+                <div class="search-result-meta"></div>
+            </div>`;
+        searchResults.insertBefore(item, noResultsNode);
+        resultNodes.push(item);
+    }
+    return resultNodes[i];
+}
 
-async function performSearch(query) {
-    try {
-        const queryLower = query.toLowerCase();
-        
-        // Simple client-side search
-        const results = searchIndex.filter(record => {
-            return (
-                record.name?.toLowerCase().includes(queryLower) ||
-                record.description?.toLowerCase().includes(queryLower) ||
-                record.steward?.toLowerCase().includes(queryLower) ||
-                record.organization?.toLowerCase().includes(queryLower) ||
-                record.brand?.toLowerCase().includes(queryLower) ||
-                record.id?.toLowerCase().includes(queryLower) ||
-                record.game?.toLowerCase().includes(queryLower)
-            );
-        }).slice(0, 10); // Limit to 10 results
-        
-        if (results.length === 0) {
-            searchResults.innerHTML = '<div style="padding: 1rem; text-align: center; color: var(--color-text-tertiary);">No results found</div>';
-            searchResults.classList.add('active');
-            return;
-        }
-        
-        searchResults.innerHTML = results.map(record => {
-            const basePath = getBasePath();
-            const recordUrl = basePath + 'record/' + record.id + '/';
-            return `
-            <a href="${recordUrl}" class="search-result-item">
-                ${record.primary_image 
-                    ? `<img src="${record.primary_image}" alt="${record.name}">`
-                    : '<div style="width: 60px; height: 60px; background: var(--color-bg-tertiary); border-radius: 4px;"></div>'
-                }
-                <div style="flex: 1;">
-                    <div style="font-weight: 600; margin-bottom: 0.25rem;">${record.name}</div>
-                    <div style="font-size: 0.75rem; color: var(--color-text-tertiary);">
-                        ${record.id} • ${record.game.toUpperCase()}
-                    </div>
-                </div>
-            </a>
-        `;
-        }).join('');
-        
-        searchResults.classList.add('active');
-    } catch (error) {
-        console.error('Search error:', error);
+// Only touches what differs from what the row already shows
+function updateResultNode(item, record, basePath) {
+    item.hidden = false;
+    const recordUrl = basePath + 'record/' + record.id + '/';
+    if (item.getAttribute('href') !== recordUrl) item.setAttribute('href', recordUrl);
+    
+    const img = item.querySelector('img');
+    const placeholder = item.querySelector('.search-result-placeholder');
+    // Locally stored images are site-relative thumbnails (static/img/...)
+    const imageUrl = !record.image ? ''
+        : /^([a-z]+:)?\/\//i.test(record.image) ? record.image : basePath + record.image;
+    if (img.getAttribute('src') !== imageUrl) {
+        if (imageUrl) img.setAttribute('src', imageUrl); else img.removeAttribute('src');
+    }
+    img.hidden = !imageUrl;
+    placeholder.hidden = Boolean(imageUrl);
+    if (img.alt !== record.name) img.alt = record.name;
+    
+    const title = item.querySelector('.search-result-title');
+    if (title.textContent !== record.name) title.textContent = record.name;
+    const meta = item.querySelector('.search-result-meta');
+    const metaText = record.id + ' • ' + String(record.game).toUpperCase();
+    if (meta.textContent !== metaText) meta.textContent = metaText;
+}
+
+// Video Facades (video_facade in templates/_macros.html): a poster and play
+// button stand in for the player, which (with its third-party scripts) only
+// loads once clicked. Pointing at a facade warms up the connection.
+const VIDEO_EMBED_ORIGIN = 'https://www.youtube.com';
+let videoOriginWarmed = false;
+
+function playVideo(facade) {
+    let player;
+    if (facade.dataset.videoType === 'youtube') {
+        player = document.createElement('iframe');
+        player.src = VIDEO_EMBED_ORIGIN + '/embed/' + encodeURIComponent(facade.dataset.video) + '?autoplay=1';
+        player.title = facade.getAttribute('aria-label');
+        player.allow = 'accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture';
+        player.allowFullscreen = true;
+        player.setAttribute('frameborder', '0');
+    } else {
+        player = document.createElement('video');
+        player.src = facade.dataset.video;
+        player.controls = true;
+        player.autoplay = true;
+        player.playsInline = true;
+    }
+    facade.replaceWith(player);
+}
+
+function warmVideoOrigin(e) {
+    const facade = e.target.closest && e.target.closest('button.video-facade');
+    if (videoOriginWarmed || !facade || facade.dataset.videoType !== 'youtube') return;
+    videoOriginWarmed = true;
+    const link = document.createElement('link');
+    link.rel = 'preconnect';
+    link.href = VIDEO_EMBED_ORIGIN;
+    document.head.appendChild(link);
+}
+
+document.addEventListener('click', (e) => {
+    const facade = e.target.closest && e.target.closest('button.video-facade');
+    if (facade) playVideo(facade);
+});
+document.addEventListener('pointerover', warmVideoOrigin);
+document.addEventListener('focusin', warmVideoOrigin);
+
+// Offline Cache and Prefetch: the build writes a service worker to the site
+// root (templates/sw.js) that precaches static files and answers pages from
+// cache while refreshing them. Pages are fetched ahead of the click - any
+// in-site link once pointed at, record links also as they scroll into view
+// (unless the visitor is saving data) - so following one is instant.
+const PREFETCH_VIEWPORT_LIMIT = 24;  // Record pages per page view
+const siteRoot = document.currentScript && new URL('../../', document.currentScript.src).href;
+const prefetched = new Set();
+let viewportPrefetches = 0;
+
+if (siteRoot && 'serviceWorker' in navigator) {
+    // scripts/serve.py has no service worker; registering just fails there
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register(siteRoot + 'sw.js').catch(() => {});
+    });
+}
+
+// Absolute URL of an in-site page a link points to (null: not one)
+function pageUrl(link) {
+    if (!siteRoot || !link || !link.href || link.target || link.hasAttribute('download')) return null;
+    const url = new URL(link.href);
+    url.hash = '';
+    if (!url.href.startsWith(siteRoot) || url.href.startsWith(siteRoot + 'static/') || url.search) return null;
+    return url.href === location.href.split('#')[0] ? null : url.href;
+}
+
+function prefetchPages(urls) {
+    urls = urls.filter(url => url && !prefetched.has(url));
+    if (!urls.length) return;
+    urls.forEach(url => prefetched.add(url));
+    const worker = navigator.serviceWorker && navigator.serviceWorker.controller;
+    if (worker) {
+        worker.postMessage({ type: 'prefetch', urls });
+    } else {
+        // First visit (no service worker yet): the HTTP cache keeps them
+        urls.forEach(url => {
+            const hint = document.createElement('link');
+            hint.rel = 'prefetch';
+            hint.href = url;
+            document.head.appendChild(hint);
+        });
+    }
+}
+
+function prefetchLink(e) {
+    const link = e.target.closest && e.target.closest('a[href]');
+    if (link) prefetchPages([pageUrl(link)]);
+}
+
+document.addEventListener('pointerover', prefetchLink);
+document.addEventListener('focusin', prefetchLink);
+
+const connection = navigator.connection;
+const saveData = Boolean(connection && (connection.saveData || /2g/.test(connection.effectiveType)));
+
+if (siteRoot && !saveData && 'IntersectionObserver' in window) {
+    const linkObserver = new IntersectionObserver((entries, observer) => {
+        const urls = [];
+        entries.forEach(entry => {
+            if (!entry.isIntersecting) return;
+            observer.unobserve(entry.target);
+            const url = pageUrl(entry.target);
+            if (url && !prefetched.has(url) && viewportPrefetches < PREFETCH_VIEWPORT_LIMIT) {
+                viewportPrefetches++;
+                urls.push(url);
+            }
+        });
+        prefetchPages(urls);
+    });
+
+    const observeRecordLinks = (root) => {
+        root.querySelectorAll('a[href*="record/"]').forEach(link => {
+            const url = pageUrl(link);
+            if (url && url.startsWith(siteRoot + 'record/')) linkObserver.observe(link);
+        });
+    };
+    observeRecordLinks(document);
+
+    // Cards static/js/browse.js renders after filtering
+    const browseResults = document.getElementById('browseResults');
+    if (browseResults) {
+        new MutationObserver(() => observeRecordLinks(browseResults))
+            .observe(browseResults, { childList: true });
     }
 }
 
@@ -208,32 +367,5 @@ function showNotification(message) {
     }, 3000);
 }
 
-// Add animations
-const style = document.createElement('style');
-style.textContent = `
-    @keyframes slideIn {
-        from {
-            transform: translateX(100%);
-            opacity: 0;
-        }
-        to {
-            transform: translateX(0);
-            opacity: 1;
-        }
-    }
-    
-    @keyframes slideOut {
-        from {
-            transform: translateX(0);
-            opacity: 1;
-        }
-        to {
-            transform: translateX(100%);
-            opacity: 0;
-        }
-    }
-`;
-document.head.appendChild(style);
-
 // Initialize
 console.log('Esports Museum initialized');
@@ -0,0 +1,139 @@
+// Esports Museum - Search worker
+//
+// Runs site search off the main thread (started by static/js/main.js) and
+// keeps the index parsed between queries. The index is built by
+// scripts/build.py into static/search/: meta.json names a content-hashed
+// directory (meta.base) holding shards/<prefix>.json (sorted terms,
+// gap-encoded posting lists of record ordinals and their bm25 scores) and
+// docs/<n>.json (display data). Files load on first use.
+//
+// In:  {sequence, query, indexUrl}
+// Out: {sequence, results: [{id, name, game, image}], done}, posted as the
+//      top results' display data arrives (each message a longer prefix of
+//      the ranking). A query is dropped as soon as a newer one arrives.
+
+const RESULT_LIMIT = 10;
+const searchFiles = new Map();   // URL -> promise of parsed JSON
+const loadedFiles = new Set();   // URLs whose promise has settled
+let latestSequence = 0;
+
+function loadSearchFile(indexUrl, path) {
+    const url = indexUrl + path;
+    if (!searchFiles.has(url)) {
+        searchFiles.set(url, fetch(url)
+            .then(response => response.ok ? response.json() : null)
+            .catch(error => {
+                console.error('Failed to load search index:', error);
+                return null;
+            })
+            .finally(() => loadedFiles.add(url)));
+    }
+    return searchFiles.get(url);
+}
+
+// Mirrors search_tokens() in scripts/build.py
+function searchTokens(text) {
+    return text.normalize('NFKD').replace(/\p{M}/gu, '').toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+}
+
+// Mirrors shard_name() in scripts/build.py
+function shardName(prefix) {
+    let name = '';
+    for (const c of prefix) {
+        name += /[a-z0-9]/.test(c) ? c : '_' + c.codePointAt(0).toString(16);
+    }
+    return name;
+}
+
+// Map of ordinal -> bm25 score for records with a term starting with token
+async function lookupToken(token, meta, indexUrl) {
+    const hits = new Map();
+    const shard = await loadSearchFile(indexUrl, meta.base + 'shards/' + shardName(token.slice(0, meta.prefix)) + '.json');
+    if (!shard) return hits;
+
+    // Terms are sorted, so prefix matches form one contiguous run
+    let lo = 0, hi = shard.terms.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (shard.terms[mid] < token) lo = mid + 1; else hi = mid;
+    }
+    for (let i = lo; i < shard.terms.length && shard.terms[i].startsWith(token); i++) {
+        const ordinals = decodePostings(shard, i);
+        const scores = shard.scores[i];
+        for (let j = 0; j < ordinals.length; j++) {
+            if (!(hits.get(ordinals[j]) >= scores[j])) hits.set(ordinals[j], scores[j]);
+        }
+    }
+    return hits;
+}
+
+// Gap-encoded postings -> ordinals, decoded once per term
+function decodePostings(shard, index) {
+    shard.decoded = shard.decoded || [];
+    if (!shard.decoded[index]) {
+        let ordinal = 0;
+        shard.decoded[index] = shard.postings[index].map(gap => (ordinal += gap));
+    }
+    return shard.decoded[index];
+}
+
+// Records matching every token, best RESULT_LIMIT by summed build-time bm25
+// scores (ties: lower ordinal = newer record first)
+function topMatches(lists) {
+    lists.sort((a, b) => a.size - b.size);
+    const top = [];  // [ordinal, score], best first
+    for (const [ordinal, score] of lists[0]) {
+        let total = score;
+        for (let i = 1; i < lists.length && total !== null; i++) {
+            const other = lists[i].get(ordinal);
+            total = other === undefined ? null : total + other;
+        }
+        if (total === null) continue;
+        if (top.length === RESULT_LIMIT) {
+            const [lastOrdinal, lastScore] = top[top.length - 1];
+            if (total < lastScore || (total === lastScore && ordinal > lastOrdinal)) continue;
+            top.pop();
+        }
+        let i = top.length;
+        while (i > 0 && (top[i - 1][1] < total || (top[i - 1][1] === total && top[i - 1][0] > ordinal))) i--;
+        top.splice(i, 0, [ordinal, total]);
+    }
+    return top;
+}
+
+async function search(sequence, query, indexUrl) {
+    const stale = () => sequence !== latestSequence;
+    const meta = await loadSearchFile(indexUrl, 'meta.json');
+    if (stale()) return;
+    const tokens = meta ? Array.from(new Set(searchTokens(query))).filter(t => t.length >= meta.min) : [];
+    if (tokens.length === 0) {
+        postMessage({ sequence, results: [], done: true });
+        return;
+    }
+
+    const lists = await Promise.all(tokens.map(token => lookupToken(token, meta, indexUrl)));
+    if (stale()) return;
+    const top = topMatches(lists);
+
+    // Display data comes in docs/ chunks (all requested at once); whenever
+    // the next result has to wait for one, post the results ready so far
+    const paths = top.map(([ordinal]) => meta.base + 'docs/' + Math.floor(ordinal / meta.chunk) + '.json');
+    const chunks = paths.map(path => loadSearchFile(indexUrl, path));
+    const results = [];
+    for (let i = 0; i < top.length; i++) {
+        if (results.length && !loadedFiles.has(indexUrl + paths[i])) {
+            postMessage({ sequence, results: results.slice(), done: false });
+        }
+        const chunk = await chunks[i];
+        if (stale()) return;
+        const [id, name, game, image] = chunk ? chunk[top[i][0] % meta.chunk] : [];
+        if (id) results.push({ id, name, game, image });
+    }
+    postMessage({ sequence, results, done: true });
+}
+
+onmessage = (e) => {
+    const { sequence, query, indexUrl } = e.data;
+    latestSequence = sequence;
+    search(sequence, query, indexUrl).catch(error => console.error('Search error:', error));
+};
@@ -0,0 +1,118 @@
+// Esports Museum - Service worker
+//
+// Generated by scripts/build.py (generate_service_worker) into the root of
+// the site, so its scope is the whole site; registered by static/js/main.js.
+//
+// - Precache: the fingerprinted stylesheets and scripts, the home page (the
+//   offline fallback) and the search index header and shards are fetched
+//   on install, into a cache named after the build's VERSION
+// - Pages: stale-while-revalidate - a cached copy is shown at once while
+//   the network refreshes it for next time
+// - Other static/ files: content-addressed ones (IMMUTABLE: search docs,
+//   browse data, resized images) cache first, as a cached copy never goes
+//   stale; anything else (media originals) stale-while-revalidate
+// - main.js asks for pages to be fetched ahead ({type: 'prefetch', urls})
+//
+// The two runtime caches keep at most MAX_ENTRIES responses each, dropping
+// the least recently stored first.
+
+const VERSION = {{ version|tojson }};
+const MAX_ENTRIES = {{ max_entries|tojson }};
+// Unchanged for as long as VERSION is, so the HTTP cache may answer
+const PRECACHE_FILES = {{ files|tojson }};
+// Updated in place between builds: always fetched from the server
+const PRECACHE_LATEST = {{ latest|tojson }};
+const IMMUTABLE = {{ immutable|tojson }};
+const OFFLINE_PAGE = './';
+
+const CACHE_PREFIX = 'museum-';
+const PRECACHE = CACHE_PREFIX + 'precache-' + VERSION;
+// Pages link the fingerprinted files of their own build, so they go with it
+const PAGES = CACHE_PREFIX + 'pages-' + VERSION;
+const DATA = CACHE_PREFIX + 'data';
+
+const scope = self.registration.scope;
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(caches.open(PRECACHE).then(cache => cache.addAll(
+        PRECACHE_FILES.concat(PRECACHE_LATEST.map(url => new Request(url, { cache: 'no-cache' })))
+    )).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(caches.keys().then(names => Promise.all(names
+        .filter(name => name.startsWith(CACHE_PREFIX) && ![PRECACHE, PAGES, DATA].includes(name))
+        .map(name => caches.delete(name))
+    )).then(() => self.clients.claim()));
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET' || !request.url.startsWith(scope)) return;
+    if (request.mode === 'navigate') {
+        event.respondWith(page(event));
+    } else if (request.url.startsWith(scope + 'static/')) {
+        event.respondWith(staticFile(event));
+    }
+});
+
+self.addEventListener('message', (event) => {
+    const message = event.data;
+    if (message && message.type === 'prefetch' && Array.isArray(message.urls)) {
+        event.waitUntil(prefetch(message.urls.filter(url => String(url).startsWith(scope))));
+    }
+});
+
+// Keep a copy of a fresh response (redirects are left to the browser: a
+// navigation cannot be answered with one)
+async function store(cacheName, request, response) {
+    if (!response.ok || response.redirected) return;
+    const cache = await caches.open(cacheName);
+    await cache.put(request, response);
+    await trim(cache);
+}
+
+// Entries are listed oldest first, and put() moves a replaced one to the end
+async function trim(cache) {
+    const keys = await cache.keys();
+    for (let i = 0; i < keys.length - MAX_ENTRIES; i++) {
+        await cache.delete(keys[i]);
+    }
+}
+
+async function page(event) {
+    const request = event.request;
+    const network = fetch(request);
+    event.waitUntil(network.then(response => store(PAGES, request, response.clone())).catch(() => {}));
+    // A refreshed copy, else the precached one (the home page)
+    const cached = (await (await caches.open(PAGES)).match(request)) || (await caches.match(request));
+    if (cached) return cached;
+    try {
+        return await network;
+    } catch (error) {
+        return (await caches.match(OFFLINE_PAGE)) || Response.error();
+    }
+}
+
+async function staticFile(event) {
+    const request = event.request;
+    const precached = await (await caches.open(PRECACHE)).match(request);
+    if (precached) return precached;
+    const cached = await (await caches.open(DATA)).match(request);
+    const path = request.url.slice(scope.length);
+    if (cached && IMMUTABLE.some(prefix => path.startsWith(prefix))) return cached;
+    const network = fetch(request);
+    event.waitUntil(network.then(response => store(DATA, request, response.clone())).catch(() => {}));
+    return cached || network;
+}
+
+async function prefetch(urls) {
+    for (const url of urls) {
+        if (await caches.match(url)) continue;
+        try {
+            await store(PAGES, url, await fetch(url, { credentials: 'same-origin' }));
+        } catch (error) {
+            return;  // Offline
+        }
+    }
+}